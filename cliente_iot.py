@@ -6,6 +6,7 @@ import json
 import os
 import argparse
 import asyncio
+import functools
 from tqdm import tqdm
 from device_events import event_manager, DeviceEvent
 from src.canonical import normalize_classification, display_label_from_label
@@ -17,10 +18,18 @@ LAST_CONN_PATH = os.path.join(BASE_DIR, "last_connection.json")
 
 # ...existing code for cargar_config(), guardar_config() and configurar()...
 
+@functools.cache
+def _cfg():
+    """
+    Configuración del cliente leída una sola vez por proceso.
+    Tras modificarla (configurar/guardar_config) llamar a _cfg.cache_clear().
+    """
+    return cargar_config()
+
 async def enviar_archivo(ruta_archivo):
     """Envía un archivo al servidor usando la configuración actual."""
-    config = cargar_config()
-    if not config:
+    cfg = _cfg()
+    if not cfg:
         print("❌ No se pudo cargar configuración.")
         return
     host, port = obtener_host_y_puerto()
@@ -131,7 +140,7 @@ async def enviar_archivo(ruta_archivo):
 
 async def iniciar_streaming(instrumento_id: str):
     """Inicia streaming de datos del instrumento"""
-    config = cargar_config()
+    config = _cfg()
     if not config:
         print("❌ No se pudo cargar configuración.")
         return
@@ -180,6 +189,7 @@ async def main_async():
 
     if args.config:
         configurar()
+        _cfg.cache_clear()
     elif args.send:
         await enviar_archivo(args.send)
     elif args.stream:
@@ -47,6 +47,7 @@ CREATE TABLE IF NOT EXISTS points (
 CREATE INDEX IF NOT EXISTS idx_measurements_session ON measurements(session_id);
 CREATE INDEX IF NOT EXISTS idx_curves_measurement ON curves(measurement_id);
 CREATE INDEX IF NOT EXISTS idx_points_curve ON points(curve_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_loaded_at ON sessions(loaded_at);
 
 -- 5) Modificaciones mínimas a measurements
 ALTER TABLE measurements
@@ -56,6 +57,10 @@ ALTER TABLE measurements
   ADD COLUMN IF NOT EXISTS classification_group SMALLINT,         -- Grupo: 0=Sin metales, 1=Con metales, 2=Anómalo
   ADD COLUMN IF NOT EXISTS contamination_level DOUBLE PRECISION;  -- Nivel de contaminación 0–100%
 
+-- 6) Instante de pared de cada muestra (solo mediciones en streaming; NULL en archivos)
+ALTER TABLE points
+  ADD COLUMN IF NOT EXISTS sample_time TIMESTAMP;
+
 -- (Opcional) Trigger para mantener updated_at en measurements
 ALTER TABLE measurements
   ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
@@ -9,6 +9,12 @@ usando la conexión de db_connection.py
 import logging
 from db_connection import conectar_bd
 
+def _como_lista(valores):
+    """pca_scores llega como ndarray desde el pipeline; el driver espera una lista."""
+    if valores is None:
+        return []
+    return valores.tolist() if hasattr(valores, 'tolist') else list(valores)
+
 def guardar_sesion_y_mediciones(session_info, measurements):
     """
     Inserta una sesión y sus mediciones en la base de datos.
@@ -66,7 +72,7 @@ def guardar_sesion_y_mediciones(session_info, measurements):
                 m.get('timestamp'),
                 m.get('device_serial', 'N/A'),
                 m.get('curve_count', 0),
-                m.get('pca_scores') or [],
+                _como_lista(m.get('pca_scores')),
                 ppm_estimations,
                 classification_group,
                 contamination_level,
@@ -30,6 +30,7 @@ class DeviceEventManager:
         self._heartbeat_timeout = 10  # segundos por defecto
         self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
         self._lock = threading.RLock()
+        self._waiters: Dict[str, list] = {}
         
     async def start(self):
         """Inicia el gestor de eventos"""
@@ -69,6 +70,9 @@ class DeviceEventManager:
         with self._lock:
             callbacks.extend(self._subscribers.get(event.type, []))
             callbacks.extend(self._subscribers.get('*', []))
+            # Despertar hilos bloqueados en wait() por este tipo de evento
+            for flag in self._waiters.get(event.type, ()):
+                flag.set()
 
         # Ejecutar cada callback; los callbacks síncronos se ejecutan en executor
         for callback in callbacks:
@@ -130,6 +134,24 @@ class DeviceEventManager:
             except Exception as e:
                 logging.error(f"emit_nowait fallo: {e}")
 
+    def wait(self, event_types, timeout: float = None) -> bool:
+        """
+        Bloquea el hilo actual hasta que se emita alguno de `event_types`
+        o venza `timeout`. Retorna True si el evento llegó.
+        """
+        if isinstance(event_types, str):
+            event_types = (event_types,)
+        flag = threading.Event()
+        with self._lock:
+            for t in event_types:
+                self._waiters.setdefault(t, []).append(flag)
+        try:
+            return flag.wait(timeout)
+        finally:
+            with self._lock:
+                for t in event_types:
+                    self._waiters[t].remove(flag)
+
     def get_subscriber_count(self, event_type: str = None) -> int:
         with self._lock:
             if event_type:
@@ -7,9 +7,11 @@ Módulo autónomo para insertar sesiones y datos electroquímicos
 la estructura definida en schema.sql, incluyendo scan_rate.
 """
 
+import io
 import os
 import sys
 import logging
+import numpy as np
 import pg8000
 from db_connection import conectar_bd
 from pstrace_session import extract_session_dict as extraer_generar, cargar_limites_ppm as cargar_limites
@@ -53,7 +55,48 @@ def guardar_sesion(conn, filename, info):
         cur.close()
 
 
-# ——— Bloque 3.3 – Función guardar_mediciones ———
+# ——— Bloque 3.3 – Inserción por lotes de puntos ———
+def _insertar_puntos(cur, filas):
+    """
+    Inserta todos los puntos (curve_id, potential, current, sample_time) de una
+    vez con COPY FROM STDIN; si el cursor no admite `stream` (backend distinto de
+    pg8000) recurre a executemany. sample_time None se escribe como NULL.
+    """
+    if not filas:
+        return
+    try:
+        payload = "".join(
+            "%d\t%r\t%r\t%s\n" % (c_id, p, c, "\\N" if t is None else t)
+            for c_id, p, c, t in filas
+        )
+        cur.execute(
+            "COPY points (curve_id, potential, current, sample_time) FROM STDIN",
+            stream=io.BytesIO(payload.encode("ascii"))
+        )
+    except TypeError:
+        cur.executemany(
+            "INSERT INTO points (curve_id, potential, current, sample_time) VALUES (%s, %s, %s, %s)",
+            filas
+        )
+
+
+def _tiempos_muestras(m):
+    """
+    Marcas de pared (ISO, µs) de las muestras de una medición en streaming:
+    np.datetime64(stream_t0) + sample_offsets_ns, vectorizado. Devuelve None si la
+    medición no trae la base temporal o no cuadra con los puntos de sus curvas.
+    """
+    t0, offsets = m.get('stream_t0'), m.get('sample_offsets_ns')
+    if t0 is None or offsets is None:
+        return None
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) != sum(len(c['potentials']) for c in m.get('curves', [])):
+        return None
+    marcas = np.datetime64(t0, 'ns') + offsets.astype('timedelta64[ns]')
+    return np.datetime_as_string(marcas, unit='us').tolist()
+
+
+# ——— Bloque 3.4 – Función guardar_mediciones ———
 def guardar_mediciones(conn, session_id, measurements):
     """
     Inserta mediciones, curvas y puntos asociados a una sesión.
@@ -63,6 +106,7 @@ def guardar_mediciones(conn, session_id, measurements):
     try:
         # Cargar límites PPM una sola vez
         limites_ppm = cargar_limites()
+        puntos = []
 
         for m in measurements:
             # Determinar classification_group en base a ppm_estimations
@@ -105,7 +149,11 @@ def guardar_mediciones(conn, session_id, measurements):
             )
             m_id = cur.fetchone()[0]
 
-            # Insertar curvas y puntos de cada medición
+            # Las curvas del streaming son tramos consecutivos de las muestras
+            tiempos = _tiempos_muestras(m)
+            pos = 0
+
+            # Insertar curvas; los puntos se acumulan para un único COPY final
             for curve in m.get('curves', []):
                 cur.execute(
                     """
@@ -117,15 +165,15 @@ def guardar_mediciones(conn, session_id, measurements):
                 )
                 curve_id = cur.fetchone()[0]
 
-                data = list(zip(curve['potentials'], curve['currents']))
-                cur.executemany(
-                    """
-                    INSERT INTO points (curve_id, potential, current)
-                    VALUES (%s, %s, %s)
-                    """,
-                    [(curve_id, p, c) for p, c in data]
+                n = len(curve['potentials'])
+                t_curva = tiempos[pos:pos + n] if tiempos is not None else [None] * n
+                pos += n
+                puntos.extend(
+                    (curve_id, float(p), float(c), t)
+                    for p, c, t in zip(curve['potentials'], curve['currents'], t_curva)
                 )
 
+        _insertar_puntos(cur, puntos)
         conn.commit()
         logging.info("Mediciones, curvas y puntos insertados correctamente con clasificación recalculada.")
     except Exception as e:
@@ -135,7 +183,7 @@ def guardar_mediciones(conn, session_id, measurements):
     finally:
         cur.close()
 
-# ——— Bloque 3.4 – Script principal ———
+# ——— Bloque 3.5 – Script principal ———
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("Uso: python insert_data.py <ruta_archivo.pssession>")
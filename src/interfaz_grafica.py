@@ -6,21 +6,228 @@ import sys
 import json
 import logging
 import datetime
+import functools
+from collections import OrderedDict
+import io
+import time
+import itertools
+import queue
+from contextlib import contextmanager
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import subprocess
 import pg8000
+import numpy as np
 import pandas as pd
 from tkcalendar import DateEntry
+import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.ticker import MaxNLocator
 from sklearn.decomposition import PCA
 import threading
 import socket
+import asyncio
+import hashlib
+import importlib
+import gzip
+import shutil
 import json
 import os
+from pathlib import Path
 from canonical import normalize_classification, display_label_from_label
 
+try:
+    import orjson  # parser en C; opera directamente sobre bytes
+except ImportError:  # orjson es opcional; se recurre a json
+    orjson = None
+
+try:
+    import zstandard as zstd  # compresión de .pssession en las transferencias IoT
+except ImportError:  # zstandard es opcional; sin él se envía el archivo en crudo
+    zstd = None
+
+# Negociación zstd en transferencias IoT: el emisor la ofrece con "encoding": "zstd"
+# en el encabezado y solo comprime si el receptor confirma con IOT_ACK_ZSTD en lugar
+# de b"ACK" (un receptor sin zstandard, o anterior a la negociación, responde b"ACK"
+# y recibe el archivo en crudo). Misma longitud que b"ACK" para lecturas de 3 bytes.
+IOT_ACK_ZSTD = b"ACZ"
+ZSTD_LEVEL = 3
+ZSTD_MIN_SIZE = 4096  # por debajo de este tamaño no compensa comprimir
+PROGRESS_INTERVAL = 1 / 30  # segundos mínimos entre refrescos de la barra de progreso IoT
+SENDFILE_CHUNK = 1 << 20  # tramo por llamada a socket.sendfile (granularidad del progreso)
+IOT_BUFFER_SIZE = 262144  # bloque de recv en el servidor IoT
+IOT_SOCK_BUF = 1 << 20  # SO_SNDBUF / SO_RCVBUF de los sockets IoT
+IOT_MAX_HEADER = 65536  # longitud máxima de la línea de encabezado JSON
+
+
+@functools.lru_cache(maxsize=None)
+def pstrace_session_api():
+    """
+    Importa pstrace_session la primera vez que se necesita y cachea sus funciones.
+    No se importa al arrancar: el módulo carga .NET (pythonnet) y termina el proceso
+    si no está disponible, lo que impediría abrir la interfaz.
+
+    Returns:
+        tuple: (extract_session_dict, cargar_limites_ppm)
+    """
+    from pstrace_session import extract_session_dict, cargar_limites_ppm
+    print("[DEBUG] Módulo pstrace_session importado correctamente")
+    return extract_session_dict, cargar_limites_ppm
+
+
+def read_json_file(path):
+    """Lee y parsea un archivo JSON sin dejar descriptores abiertos.
+
+    Usa orjson cuando está instalado y json de la stdlib en caso contrario.
+    """
+    raw = Path(path).read_bytes()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def write_json_file(path, obj):
+    """Escribe `obj` como JSON indentado (2 espacios) en `path`."""
+    if orjson is not None:
+        Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        Path(path).write_text(json.dumps(obj, indent=2), encoding="utf-8")
+
+
+def sha256_file(path, block_size=1 << 20):
+    """Calcula el SHA-256 de un archivo en flujo (memoria O(bloque)); usa hashlib.file_digest si existe."""
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for blk in iter(lambda: f.read(block_size), b""):
+            h.update(blk)
+    return h.hexdigest()
+
+
+def gunzip_file(path):
+    """Descomprime `path` (.gz) junto a él en bloques de 1 MiB y elimina el comprimido."""
+    out_path = path[:-3] if path.endswith(".gz") else path + ".out"
+    try:
+        with gzip.open(path, "rb") as src, open(out_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+    except Exception:
+        # Sin salida parcial: solo queda el .gz recibido
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise
+    os.remove(path)
+    return out_path
+
+
+def seq_len(v):
+    """Longitud de una celda de pca_scores; None/NaN (celdas vacías de pandas) cuentan como 0."""
+    return len(v) if hasattr(v, "__len__") else 0
+
+
+def scores_matrix(scores, dtype=np.float32):
+    """
+    Apila vectores de longitud variable en una matriz contigua (n, max_len) rellenando
+    con ceros; los valores ausentes (None/NaN) también quedan en 0.
+    """
+    lens = [seq_len(v) for v in scores]
+    X = np.zeros((len(scores), max(lens, default=0)), dtype=dtype)
+    for i, (v, n) in enumerate(zip(scores, lens)):
+        if n:
+            X[i, :n] = np.asarray(v, dtype=dtype)
+    return np.nan_to_num(X, copy=False)
+
+
+def fit_local_pca(X, max_components=None):
+    """
+    Ajusta un PCA truncado para la gráfica de varianza: solo se muestran las primeras
+    componentes, así que basta un SVD aleatorizado de k componentes en lugar del
+    SVD completo. Con matrices diminutas se usa el PCA completo.
+    """
+    if max_components is None:
+        max_components = PCA_MAX_COMPONENTS
+    k = min(max_components, min(X.shape) - 1)
+    if k < 1:
+        return PCA().fit(X)
+    return PCA(n_components=k, svd_solver="randomized", random_state=0).fit(X)
+
+
+_MEASUREMENT_COLS = (
+    "(session_id, title, timestamp, device_serial, curve_count, pca_scores,"
+    " classification_group, contamination_level)"
+)
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def classify_levels(levels, groups=None):
+    """
+    Asigna classification_group de forma vectorizada. Se respeta el grupo existente y,
+    donde falta, se infiere del nivel (% respecto al límite): >= 100 -> 1 (alta),
+    >= 65 -> 2 (media), resto -> 0 (seguro). Un nivel ausente no se trata como 0:
+    queda NaN y, sin grupo previo, el grupo también queda NaN (NULL en la BD).
+
+    Returns:
+        tuple: (niveles float64, grupos float64), con NaN donde se desconocen
+    """
+    lv = pd.to_numeric(pd.Series(levels, dtype=object), errors="coerce").to_numpy(dtype=float)
+    inferido = np.select([lv >= 100, lv >= 65, ~np.isnan(lv)], [1, 2, 0], default=np.nan)
+    if groups is None:
+        return lv, inferido
+    g = pd.to_numeric(pd.Series(groups, dtype=object), errors="coerce").to_numpy(dtype=float)
+    return lv, np.where(np.isnan(g), inferido, g)
+
+
+def nullable(values, cast=float):
+    """Lista de valores nativos con NaN -> None (NULL en executemany y COPY)."""
+    return [None if v != v else cast(v) for v in values.tolist()]
+
+
+def copy_text_field(value):
+    """Serializa un valor al formato de texto de COPY (NULL = \\N, listas = arreglo PG)."""
+    if value is None or (isinstance(value, float) and value != value):
+        return "\\N"
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return "{" + ",".join("NULL" if v is None else repr(float(v)) for v in value) + "}"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def insert_measurements(cur, rows):
+    """
+    Inserta las filas de measurements: con executemany (pg8000 prepara la sentencia una
+    vez por conexión) o, a partir de COPY_MIN_ROWS filas, con un único COPY FROM STDIN
+    que evita el intercambio de mensajes por fila.
+    """
+    if not rows:
+        return
+    if len(rows) >= COPY_MIN_ROWS:
+        payload = "".join("\t".join(map(copy_text_field, row)) + "\n" for row in rows)
+        cur.execute(
+            f"COPY measurements {_MEASUREMENT_COLS} FROM STDIN",
+            stream=io.BytesIO(payload.encode("utf-8")),
+        )
+        return
+    cur.executemany(
+        f"INSERT INTO measurements {_MEASUREMENT_COLS} VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        rows,
+    )
+
+
+def tune_iot_socket(sock):
+    """
+    Ajusta un socket IoT para transferencias grandes: buffers del kernel de 1 MiB y
+    TCP_NODELAY para que el encabezado JSON y los ACK no esperen por Nagle.
+    """
+    for opt in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, opt, IOT_SOCK_BUF)
+        except OSError:
+            pass  # el SO puede limitar el tamaño; se mantiene el valor por defecto
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
+
 
 def ensure_display_label_for_measurement(m: dict) -> dict:
     """Asegura que el dict de medición tenga `clasificacion` canónica y `display_label`.
@@ -107,6 +314,24 @@ DEFAULT_SETTINGS = {"cycles": [2, 3, 4, 5], "ppm_factor": 1.0, "alert_threshold"
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 log = logging.getLogger()
 
+# Estilo "fast" de Matplotlib: simplifica trazos y trocea paths largos en Agg
+mpl.style.use("fast")
+mpl.rcParams["path.simplify"] = True
+mpl.rcParams["path.simplify_threshold"] = 1.0
+mpl.rcParams["agg.path.chunksize"] = 10000
+MAX_TICKS = 6  # Número máximo de ticks por eje en las gráficas
+QUERY_BATCH = 200  # Filas por lote al poblar la tabla de consultas
+PCA_MAX_COMPONENTS = 10  # Componentes del PCA local mostrado en la pestaña PCA
+PCA_CACHE_SIZE = 4  # Sesiones cuyo PCA ajustado se conserva (LRU)
+DB_POOL_SIZE = 4  # Conexiones a PostgreSQL que se mantienen abiertas para reutilizar
+COPY_MIN_ROWS = 1000  # A partir de estas mediciones se inserta con COPY en vez de executemany
+
+
+def limit_ticks(ax, nbins=MAX_TICKS):
+    """Limita el número de ticks de ambos ejes (ax.clear() restablece los locators)."""
+    ax.xaxis.set_major_locator(MaxNLocator(nbins))
+    ax.yaxis.set_major_locator(MaxNLocator(nbins))
+
 
 class Aplicacion(tk.Tk):
     """
@@ -129,6 +354,9 @@ class Aplicacion(tk.Tk):
         self.session_info = {}  # Diccionario con metadatos de la sesión
         self.ppm_df = None  # DataFrame para la tabla de estimaciones ppm
         self.settings = self.load_settings()  # Carga o crea el archivo settings.json
+        self._session_sql = self._build_session_queries()  # Variantes SQL de query_sessions
+        self._pca_cache = OrderedDict()  # LRU de PCA ajustados por (session_id, nº de mediciones)
+        self._db_pool = queue.Queue(maxsize=DB_POOL_SIZE)  # Conexiones pg8000 reutilizables
 
         # Configurar estilo de la interfaz, crear menú y pestañas
         self.setup_style()
@@ -136,6 +364,82 @@ class Aplicacion(tk.Tk):
         self.create_tabs()
         self.load_sessions()
 
+    @staticmethod
+    def _build_session_queries():
+        """
+        Construye una sola vez las 4 variantes SQL de query_sessions, indexadas por
+        (filtra_por_id, filtra_por_dispositivo). El texto de cada variante es estable,
+        así el caché de sentencias de pg8000 y el plan de PostgreSQL se reutilizan.
+
+        Returns:
+            dict: {(bool, bool): str}
+        """
+        base = """
+            SELECT
+              s.id,
+              s.filename,
+              s.loaded_at::date AS fecha,
+              m.device_serial AS dispositivo,
+              m.curve_count AS curvas,
+                            CASE
+                                WHEN m.classification_group = 1 THEN '⚠ CONTAMINACIÓN ALTA'
+                                WHEN m.classification_group = 2 THEN '⚡ CONTAMINACIÓN MEDIA'
+                                ELSE '✅ SEGURO'
+                            END AS estado,
+              COALESCE(ROUND(m.contamination_level::numeric, 2), 0) AS max_ppm,
+              m.title AS contaminantes
+            FROM sessions s
+            JOIN measurements m
+              ON s.id = m.session_id
+            WHERE s.loaded_at >= %s AND s.loaded_at < %s + interval '1 day'
+        """
+        queries = {}
+        for has_id in (False, True):
+            for has_dev in (False, True):
+                sql = base
+                if has_id:
+                    sql += "  AND s.id = %s\n"
+                if has_dev:
+                    sql += "  AND m.device_serial = %s\n"
+                queries[(has_id, has_dev)] = sql + "ORDER BY s.loaded_at DESC"
+        return queries
+
+    # ————— Bloque: Pool de conexiones a la BD —————
+    def _acquire_conn(self):
+        """Toma una conexión libre del pool o abre una nueva si no hay ninguna."""
+        try:
+            return self._db_pool.get_nowait()
+        except queue.Empty:
+            return pg8000.connect(**DB_CONFIG)
+
+    def _release_conn(self, conn, broken=False):
+        """
+        Devuelve la conexión al pool cerrando su transacción (rollback tras commit es
+        inocuo). Si falló o el pool está lleno, se cierra.
+        """
+        if not broken:
+            try:
+                conn.rollback()
+                self._db_pool.put_nowait(conn)
+                return
+            except Exception:
+                pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def _conn(self):
+        """Conexión prestada del pool durante el bloque `with`."""
+        conn = self._acquire_conn()
+        try:
+            yield conn
+        except BaseException:
+            self._release_conn(conn, broken=True)
+            raise
+        self._release_conn(conn)
+
     def load_file(self):
         """
         Llama al método de selección de archivo para cargar .pssession.
@@ -151,12 +455,11 @@ class Aplicacion(tk.Tk):
             dict: Diccionario de ajustes.
         """
         if not os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, "w") as f:
-                json.dump(DEFAULT_SETTINGS, f, indent=2)
+            write_json_file(SETTINGS_FILE, DEFAULT_SETTINGS)
             return DEFAULT_SETTINGS.copy()
         try:
-            return json.load(open(SETTINGS_FILE))
-        except:
+            return read_json_file(SETTINGS_FILE)
+        except Exception:
             log.warning("No se pudo leer settings.json; usando valores por defecto")
             return DEFAULT_SETTINGS.copy()
 
@@ -164,15 +467,18 @@ class Aplicacion(tk.Tk):
         """
         Guarda los ajustes actuales en el archivo settings.json.
         """
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(self.settings, f, indent=2)
+        write_json_file(SETTINGS_FILE, self.settings)
         log.info("Settings guardados: %s", self.settings)
 
     # ————— Bloque: Estilos —————
     def setup_style(self):
         """
         Configura el estilo visual de la aplicación (colores, fuentes, temas) utilizando ttk.Style.
+        Idempotente: las llamadas posteriores a la primera no vuelven a tocar el estilo.
         """
+        if getattr(self, "_style_ready", False):
+            return
+        self._style_ready = True
         s = ttk.Style(self)
         s.theme_use("clam")
         s.configure("TFrame", background=COLOR_BG)
@@ -205,17 +511,57 @@ class Aplicacion(tk.Tk):
         """
         Crea las pestañas principales de la interfaz para diferentes módulos:
         Cargar Datos, Consultas, Detalle, Curvas, PCA y ppm.
+
+        Solo se crean los marcos vacíos; el contenido de cada pestaña se construye
+        la primera vez que se selecciona (figuras Matplotlib y consultas a BD
+        quedan fuera del arranque). La pestaña de carga se construye de inmediato
+        porque es la visible al iniciar y aloja el log general.
         """
         nb = ttk.Notebook(self)
         nb.pack(fill="both", expand=True)
-        self.build_load_tab(nb)
-        self.build_query_tab(nb)
-        self.build_detail_tab(nb)
-        self.build_curve_tab(nb)
-        self.build_pca_tab(nb)
-        self.build_ppm_tab(nb)
-        self.build_iot_tab(nb)
-        
+        self.nb = nb
+
+        tabs = [
+            ("load", "📤 Cargar Datos", self.build_load_tab),
+            ("query", "🔍 Consultas", self.build_query_tab),
+            ("detail", "📝 Detalle Sesión", self.build_detail_tab),
+            ("curve", "📊 Curvas", self.build_curve_tab),
+            ("pca", "📈 PCA", self.build_pca_tab),
+            ("ppm", "🗂 Clasificación", self.build_ppm_tab),
+            ("iot", "🌐 IoT / Comunicación", self.build_iot_tab),
+        ]
+        self._tab_frames = {}
+        self._tab_builders = {}
+        self._tab_index = {}
+        self._tab_built = set()
+        for idx, (key, label, builder) in enumerate(tabs):
+            f = ttk.Frame(nb)
+            nb.add(f, text=label)
+            self._tab_frames[idx] = f
+            self._tab_builders[idx] = builder
+            self._tab_index[key] = idx
+
+        self._build_tab(self._tab_index["load"])
+        nb.bind("<<NotebookTabChanged>>", self._on_tab_select)
+
+    def _build_tab(self, idx):
+        """Construye el contenido de la pestaña `idx` si aún no se ha construido."""
+        if idx not in self._tab_built:
+            self._tab_built.add(idx)
+            self._tab_builders[idx](self._tab_frames[idx])
+
+    def _on_tab_select(self, _event):
+        """Construye bajo demanda la pestaña recién seleccionada."""
+        self._build_tab(self.nb.index("current"))
+
+    def ensure_tabs(self, *keys):
+        """
+        Garantiza que las pestañas indicadas estén construidas antes de usar sus widgets
+        (p. ej. al cargar un archivo se actualizan Detalle, Curvas, PCA y Clasificación).
+        """
+        for key in keys:
+            self._build_tab(self._tab_index[key])
+
 
     # ————— Bloque: Pestaña “Cargar Datos” —————
     def build_load_tab(self, parent):
@@ -223,10 +569,9 @@ class Aplicacion(tk.Tk):
         Configura la pestaña de carga de datos (.pssession).
 
         Args:
-            parent (ttk.Notebook): Notebook padre donde se añade la pestaña.
+            parent (ttk.Frame): Marco de la pestaña creado por create_tabs.
         """
-        f = ttk.Frame(parent)
-        parent.add(f, text="📤 Cargar Datos")
+        f = parent
         ttk.Button(f, text="Seleccionar Archivo .pssession", command=self.load_file).pack(pady=20)
         self.log_text = tk.Text(f, height=8, bg="#34495e", fg="white", font=("Courier", 10))
         self.log_text.pack(fill="x", padx=10, pady=10)
@@ -289,8 +634,7 @@ class Aplicacion(tk.Tk):
           2.2.4 Detalles técnicos
         """
         print("[DEBUG] build_query_tab() invoked")
-        tab = ttk.Frame(parent)
-        parent.add(tab, text="🔍 Consultas")
+        tab = parent
 
         self._create_overview_panel(tab)  # 2.2.1
         self._create_filters_panel(tab)  # 2.2.2
@@ -422,8 +766,13 @@ class Aplicacion(tk.Tk):
         self.tree.pack(fill="both", expand=True)
         ToolTip(self.tree, "Tabla con las sesiones encontradas; selecciona una para ver detalles.")
 
-        self.tree.tag_configure("alert", background="#ffebee", foreground="#c62828")
-        self.tree.tag_configure("safe", background="#e8f5e9", foreground="#2e7d32")
+        # Estilos de fila por estado: se configuran una sola vez al crear la tabla
+        for name, bg, fg in (
+            ("alert", "#ffebee", "#c62828"),    # rojo claro
+            ("warning", "#fff9c4", "#f57f17"),  # amarillo claro
+            ("safe", "#e8f5e9", "#2e7d32"),     # verde claro
+        ):
+            self.tree.tag_configure(name, background=bg, foreground=fg)
         self.tree.bind("<<TreeviewSelect>>", lambda ev: self.on_session_select())
         ToolTip(self.tree, "Al hacer clic en una fila, se mostrarán los detalles técnicos abajo.")
 
@@ -468,9 +817,9 @@ class Aplicacion(tk.Tk):
             log.debug(f"ID inválido: '{sid_text}' – ignorando filtro de ID.")
             session_id = None
 
-        # 2) Fechas y filtros de dispositivo
-        start_date = self.date_start.get_date().strftime("%Y-%m-%d")
-        end_date = self.date_end.get_date().strftime("%Y-%m-%d")
+        # 2) Fechas (datetime.date, pg8000 las envía tipadas) y filtros de dispositivo
+        start_date = self.date_start.get_date()
+        end_date = self.date_end.get_date()
 
         device = self.device_combobox.get()
         use_device_filter = device and device != "— Todos —"
@@ -481,56 +830,68 @@ class Aplicacion(tk.Tk):
         if use_device_filter:
             params.append(device)
 
-        # 3) Consulta SQL principal
-        sql = """
-            SELECT
-              s.id,
-              s.filename,
-              s.loaded_at::date AS fecha,
-              m.device_serial AS dispositivo,
-              m.curve_count AS curvas,
-                            CASE
-                                WHEN m.classification_group = 1 THEN '⚠ CONTAMINACIÓN ALTA'
-                                WHEN m.classification_group = 2 THEN '⚡ CONTAMINACIÓN MEDIA'
-                                ELSE '✅ SEGURO'
-                            END AS estado,
-              COALESCE(ROUND(m.contamination_level::numeric, 2), 0) AS max_ppm,
-              m.title AS contaminantes
-            FROM sessions s
-            JOIN measurements m
-              ON s.id = m.session_id
-            WHERE s.loaded_at::date BETWEEN %s AND %s
-        """
-        if session_id is not None:
-            sql += "  AND s.id = %s\n"
-        if use_device_filter:
-            sql += "  AND m.device_serial = %s\n"
-
-        sql += "ORDER BY s.loaded_at DESC"
+        # 3) Consulta SQL principal (variante precompilada según filtros activos)
+        sql = self._session_sql[(session_id is not None, bool(use_device_filter))]
 
         log.debug(f"Params tuple: {params}")
         log.debug(f"SQL:\n{sql}")
 
-        # 4) Ejecutar la consulta
+        # 4) Ejecutar la consulta (las filas se consumen del cursor por lotes)
+        # La conexión se toma del pool y la devuelve _pump_session_rows al terminar
+        conn = None
         try:
-            conn = pg8000.connect(**DB_CONFIG)
+            conn = self._acquire_conn()
             cur = conn.cursor()
             cur.execute(sql, tuple(params))
-            rows = cur.fetchall()
-            conn.close()
         except Exception as e:
+            if conn is not None:
+                self._release_conn(conn, broken=True)
             log.error(f"Error en query_sessions: {e}")
             messagebox.showerror("Error en consulta", f"No se pudo ejecutar la consulta:\n{e}")
             return
 
-        # 5) Limpiar y poblar la tabla
+        # 5) Limpiar la tabla y poblarla en lotes de QUERY_BATCH filas por vuelta del
+        #    bucle de Tk: la primera página aparece sin esperar al resto del resultado.
         self.tree.delete(*self.tree.get_children())
+        self._query_gen = getattr(self, "_query_gen", 0) + 1
+        self._pump_session_rows(conn, iter(cur), self._query_gen, 0)
 
-        if not rows:
+    def _pump_session_rows(self, conn, rows, gen, total):
+        """
+        Inserta en la tabla el siguiente lote de filas del cursor y se reprograma con
+        after_idle hasta agotarlo. Si se lanzó otra consulta entretanto (gen distinto),
+        abandona el cursor anterior.
+        """
+        if gen != self._query_gen:
+            self._release_conn(conn)
+            return
+
+        try:
+            batch = list(itertools.islice(rows, QUERY_BATCH))
+        except Exception as e:
+            log.error(f"Error leyendo resultados de query_sessions: {e}")
+            batch = []
+
+        if batch:
+            self._insert_batch(batch)
+            total += len(batch)
+            if len(batch) == QUERY_BATCH:
+                self.after_idle(self._pump_session_rows, conn, rows, gen, total)
+                return
+
+        self._release_conn(conn)
+        if not total:
             self.tree.insert("", "end", values=("--", "Sin resultados", "--", "--", "--", "--", "--", "--"))
             return
 
-        for r in rows:
+        log.debug(f"✅ {total} filas actualizadas en la tabla de resultados")
+
+        # 6) Refrescar estadísticas (los estilos de fila se configuran en _create_results_table)
+        self.update_overview()
+
+    def _insert_batch(self, batch):
+        """Inserta un lote de filas de sesiones en la tabla con su etiqueta de estado."""
+        for r in batch:
             estado_texto = str(r[5]).upper()
             if "CONTAMINADA" in estado_texto:
                 tag = "alert"
@@ -541,16 +902,6 @@ class Aplicacion(tk.Tk):
 
             self.tree.insert("", "end", values=r, tags=(tag,))
 
-        # 6) Estilos visuales
-        self.tree.tag_configure("alert", background="#ffebee", foreground="#c62828")    # rojo claro
-        self.tree.tag_configure("warning", background="#fff9c4", foreground="#f57f17")  # amarillo claro
-        self.tree.tag_configure("safe", background="#e8f5e9", foreground="#2e7d32")     # verde claro
-
-        log.debug(f"✅ {len(rows)} filas actualizadas en la tabla de resultados")
-
-        # 7) Refrescar estadísticas
-        self.update_overview()
-
 
     # ——— Bloque 2.5: load_devices (mejorado) ———
     def load_devices(self):
@@ -565,18 +916,17 @@ class Aplicacion(tk.Tk):
             return
 
         try:
-            conn = pg8000.connect(**DB_CONFIG)
-            cur = conn.cursor()
-            cur.execute(
+            with self._conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    SELECT DISTINCT device_serial
+                    FROM measurements
+                    WHERE device_serial IS NOT NULL
+                    ORDER BY device_serial
                 """
-                SELECT DISTINCT device_serial
-                FROM measurements
-                WHERE device_serial IS NOT NULL
-                ORDER BY device_serial
-            """
-            )
-            vals = [row[0] for row in cur.fetchall()]
-            conn.close()
+                )
+                vals = [row[0] for row in cur.fetchall()]
 
             # Siempre incluir “— Todos —” al inicio
             options = ["— Todos —"] + vals if vals else ["— Todos —"]
@@ -610,27 +960,26 @@ class Aplicacion(tk.Tk):
             return
 
         try:
-            conn = pg8000.connect(**DB_CONFIG)
-            cur = conn.cursor()
-
-            queries = {
-                "total_sessions": "SELECT COUNT(*) FROM sessions",
-                "total_measurements": "SELECT COUNT(*) FROM measurements",
-                "avg_ppm": "SELECT ROUND(AVG(contamination_level)::numeric, 2) FROM measurements",
-                "max_ppm": "SELECT ROUND(MAX(contamination_level)::numeric, 2) FROM measurements",
-                "alert_count": "SELECT COUNT(*) FROM measurements WHERE contamination_level > %s",
-                "last_update": "SELECT MAX(loaded_at) FROM sessions",
-            }
-
-            stats = {}
-            for key, sql in queries.items():
-                if key == "alert_count":
-                    cur.execute(sql, (self.settings["alert_threshold"],))
-                else:
-                    cur.execute(sql)
-                stats[key] = cur.fetchone()[0]
+            with self._conn() as conn:
+                cur = conn.cursor()
+
+                queries = {
+                    "total_sessions": "SELECT COUNT(*) FROM sessions",
+                    "total_measurements": "SELECT COUNT(*) FROM measurements",
+                    "avg_ppm": "SELECT ROUND(AVG(contamination_level)::numeric, 2) FROM measurements",
+                    "max_ppm": "SELECT ROUND(MAX(contamination_level)::numeric, 2) FROM measurements",
+                    "alert_count": "SELECT COUNT(*) FROM measurements WHERE contamination_level > %s",
+                    "last_update": "SELECT MAX(loaded_at) FROM sessions",
+                }
+
+                stats = {}
+                for key, sql in queries.items():
+                    if key == "alert_count":
+                        cur.execute(sql, (self.settings["alert_threshold"],))
+                    else:
+                        cur.execute(sql)
+                    stats[key] = cur.fetchone()[0]
 
-            conn.close()
             print(f"[DEBUG] update_overview: stats fetched: {stats}")
 
             # Actualizar labels
@@ -688,10 +1037,9 @@ class Aplicacion(tk.Tk):
         para información detallada de la sesión.
 
         Args:
-            parent (ttk.Notebook): Notebook donde se añade la pestaña.
+            parent (ttk.Frame): Marco de la pestaña creado por create_tabs.
         """
-        f = ttk.Frame(parent)
-        parent.add(f, text="📝 Detalle Sesión")
+        f = parent
         self.txt_detail = tk.Text(f, wrap="word", bg="#34495e", fg="white", font=("Arial", 10))
         self.txt_detail.pack(fill="both", expand=True, padx=10, pady=10)
         ToolTip(self.txt_detail, "Aquí se muestra la información detallada (JSON) de la sesión seleccionada")
@@ -702,10 +1050,9 @@ class Aplicacion(tk.Tk):
         Configura la pestaña 'Curvas' para visualizar curvas individuales y promedio.
 
         Args:
-            parent (ttk.Notebook): Notebook donde se añade la pestaña.
+            parent (ttk.Frame): Marco de la pestaña creado por create_tabs.
         """
-        f = ttk.Frame(parent)
-        parent.add(f, text="📊 Curvas")
+        f = parent
         frm = ttk.Frame(f)
         frm.pack(fill="x", padx=10, pady=8)
 
@@ -721,6 +1068,7 @@ class Aplicacion(tk.Tk):
         self.ax_curve.set_facecolor(COLOR_BG)
         self.ax_curve.tick_params(colors="white")
         self.ax_curve.grid(True, color="#5d6d7e")
+        limit_ticks(self.ax_curve)
         self.canvas_curve = FigureCanvasTkAgg(self.fig_curve, master=f)
         self.canvas_curve.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
         ToolTip(self.canvas_curve.get_tk_widget(), "Gráfica de corriente vs potencial para la curva seleccionada")
@@ -736,8 +1084,7 @@ class Aplicacion(tk.Tk):
         Configura la pestaña 'ppm' (ahora 'Clasificación') para mostrar
         grupo y nivel de contaminación y permitir su exportación.
         """
-        f = ttk.Frame(parent)
-        parent.add(f, text="🗂 Clasificación")
+        f = parent
 
         # Botón para refrescar la vista de clasificación
         btn_show_ppm = ttk.Button(
@@ -776,8 +1123,7 @@ class Aplicacion(tk.Tk):
         Crea la pestaña para control del servidor IoT, conexión remota y envío de archivos.
         Permite iniciar/detener servidor, probar conexión y transferir archivos.
         """
-        f = ttk.Frame(parent)
-        parent.add(f, text="🌐 IoT / Comunicación")
+        f = parent
 
         ttk.Label(f, text="Centro de Control IoT", font=("Arial", 14, "bold")).pack(pady=10)
 
@@ -858,193 +1204,277 @@ class Aplicacion(tk.Tk):
         log.info("[IoT] " + msg)
 
     def start_iot_server(self):
-        """Inicia el servidor IoT en un hilo separado."""
+        """Inicia el servidor IoT (asyncio) en un hilo con su propio bucle de eventos."""
         if self.server_running:
             self.log_iot("⚠️ El servidor ya está en ejecución.")
             return
 
-        def server_loop():
-            # Imports locales para evitar depender del scope global si pegas este bloque
-            import sys
-            import importlib
-            import threading
-            import hashlib
-            import socket
-            import json
-            import os
-
-            # Asegurar que la raíz del proyecto esté en sys.path para que `from src...` funcione
-            project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-            if project_root not in sys.path:
-                sys.path.insert(0, project_root)
-
-            host = "0.0.0.0"
-            port = self.iot_port_var.get()
-            buffer_size = 4096
-            dest_dir = os.path.join(os.path.dirname(__file__), "..", "archivos_recibidos")
-            os.makedirs(dest_dir, exist_ok=True)
+        # Asegurar que la raíz del proyecto esté en sys.path para que `from src...` funcione
+        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        if project_root not in sys.path:
+            sys.path.insert(0, project_root)
 
+        host = "0.0.0.0"
+        port = self.iot_port_var.get()
+        dest_dir = os.path.join(os.path.dirname(__file__), "..", "archivos_recibidos")
+        os.makedirs(dest_dir, exist_ok=True)
+
+        # Lanzar el hilo con el bucle de eventos del servidor
+        self.server_running = True
+        self._iot_loop = asyncio.new_event_loop()
+        self.server_thread = threading.Thread(
+            target=self._run_iot_loop,
+            args=(self._iot_loop, host, port, dest_dir),
+            daemon=True,
+        )
+        self.server_thread.start()
+
+    def _run_iot_loop(self, loop, host, port, dest_dir):
+        """Cuerpo del hilo del servidor: ejecuta _serve_iot hasta que se cancele."""
+        asyncio.set_event_loop(loop)
+        self._iot_task = loop.create_task(self._serve_iot(host, port, dest_dir))
+        try:
+            loop.run_until_complete(self._iot_task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.log_iot(f"❌ Error en servidor: {e}")
+        finally:
+            loop.close()
+            self.server_running = False
+            self.log_iot("🛑 Servidor IoT detenido.")
+
+    async def _serve_iot(self, host, port, dest_dir):
+        """
+        Bucle de aceptación sobre epoll/kqueue (asyncio): sin sondeo periódico mientras
+        está inactivo y cada cliente se atiende en su propia tarea, de modo que varios
+        nodos pueden subir archivos a la vez. SO_REUSEADDR evita EADDRINUSE al reiniciar.
+        """
+        loop = asyncio.get_running_loop()
+        clients = set()
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            tune_iot_socket(server)  # antes de listen(): lo heredan los sockets aceptados
+            server.setblocking(False)
+            server.bind((host, port))
+            server.listen(5)
             self.log_iot(f"🌐 Servidor IoT escuchando en {host}:{port}")
-            self.server_running = True
+            try:
+                while True:
+                    conn, addr = await loop.sock_accept(server)
+                    task = loop.create_task(self._iot_client(conn, addr, dest_dir))
+                    clients.add(task)
+                    task.add_done_callback(clients.discard)
+            finally:
+                for task in list(clients):
+                    task.cancel()
+                await asyncio.gather(*clients, return_exceptions=True)
+
+    async def _iot_client(self, conn, addr, dest_dir):
+        """Atiende una conexión aceptada y la cierra al terminar."""
+        self.log_iot(f"📡 Conexión desde {addr}")
+        conn.setblocking(False)
+        tune_iot_socket(conn)
+        with conn:
+            try:
+                # Clientes con keep_alive encadenan varios archivos en la misma conexión
+                keep_open = await self._handle_iot_client(conn, addr, dest_dir)
+                while keep_open:
+                    keep_open = await self._handle_iot_client(conn, addr, dest_dir, idle=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log_iot(f"❌ Error en servidor: {e}")
 
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
-                server.bind((host, port))
-                server.listen(5)
-                server.settimeout(1)
+    @staticmethod
+    async def _iot_reply(loop, conn, data):
+        """Envía una respuesta corta al cliente ignorando errores de socket."""
+        try:
+            await loop.sock_sendall(conn, data)
+        except Exception:
+            pass
 
-                while self.server_running:
-                    try:
-                        conn, addr = server.accept()
-                        self.log_iot(f"📡 Conexión desde {addr}")
-                        with conn:
-                            header_data = b""
-                            while not header_data.endswith(b"\n"):
-                                try:
-                                    chunk = conn.recv(1)
-                                except Exception as e:
-                                    self.log_iot(f"❌ Error leyendo socket: {e}")
-                                    break
-                                if not chunk:
-                                    break
-                                header_data += chunk
-
-                            if not header_data:
-                                self.log_iot("⚠️ Conexión vacía.")
-                                continue
-
-                            header_text = header_data.decode(errors="replace").strip()
-
-                            # Manejar pings enviados como texto simple
-                            if header_text.lower() == "ping" or header_text.lower() == "ping\n":
-                                self.log_iot(f"📡 Ping recibido (texto) desde {addr}")
-                                try:
-                                    conn.sendall(b"PONG\n")
-                                except Exception:
-                                    pass
-                                continue
-
-                            # Intentar parsear JSON; si falla, responder y continuar
-                            try:
-                                header = json.loads(header_text)
-                            except Exception as e:
-                                self.log_iot(f"❌ Encabezado inválido (no JSON): {header_text!r} - {e}")
-                                try:
-                                    conn.sendall(b"ERR_INVALID_HEADER\n")
-                                except Exception:
-                                    pass
-                                continue
-
-                            # --- Soportar ping enviado como JSON {"action":"ping"} ---
-                            if isinstance(header, dict) and header.get("action") == "ping":
-                                self.log_iot(f"📡 Ping JSON recibido desde {addr}")
-                                try:
-                                    conn.sendall(b"PONG\n")
-                                except Exception:
-                                    pass
-                                continue
-                            # ----------------------------------------------------------------
-
-                            # Validar keys mínimas para transferencia de archivos
-                            if not all(k in header for k in ("filename", "size", "checksum")):
-                                self.log_iot(f"❌ Encabezado incompleto: {header}")
-                                try:
-                                    conn.sendall(b"ERR_INCOMPLETE_HEADER\n")
-                                except Exception:
-                                    pass
-                                continue
-
-                            serial = header.get("serial", "DESCONOCIDO")
-                            self.log_iot(f"🔎 Dispositivo detectado: {serial}")
-
-                            # Ejecutar sesión remota en un hilo (import dinámico tolerante)
-                            try:
-                                try:
-                                    from src.pstrace_connection import ejecutar_sesion_remota_iot
-                                except Exception:
-                                    mod = importlib.import_module("pstrace_connection")
-                                    ejecutar_sesion_remota_iot = getattr(mod, "ejecutar_sesion_remota_iot")
-
-                                method_params = {}  # personaliza según tu sensor
-                                threading.Thread(
-                                    target=ejecutar_sesion_remota_iot,
-                                    args=(serial, method_params, None),
-                                    daemon=True
-                                ).start()
-                                self.log_iot(f"🔧 Sesión remota lanzada para {serial}")
-                            except Exception as e:
-                                self.log_iot(f"❌ Error ejecutando sesión remota para {serial}: {e}")
-
-                            # Recibir archivo y verificar checksum
-                            try:
-                                filename = header["filename"]
-                                size = int(header["size"])
-                                checksum = header["checksum"]
-
-                                filepath = os.path.join(dest_dir, filename)
-                                # Confirmar que el servidor está listo para recibir
-                                try:
-                                    conn.sendall(b"ACK")
-                                except Exception:
-                                    pass
-
-                                with open(filepath, "wb") as f:
-                                    total_received = 0
-                                    while total_received < size:
-                                        chunk = conn.recv(buffer_size)
-                                        if not chunk:
-                                            break
-                                        f.write(chunk)
-                                        total_received += len(chunk)
-
-                                self.log_iot(f"✅ Archivo recibido: {filename} ({total_received/1e6:.2f} MB)")
-
-                                # Verificar checksum (no fallar el servidor si algo sale mal)
-                                try:
-                                    actual = hashlib.sha256(open(filepath, "rb").read()).hexdigest()
-                                    if actual != checksum:
-                                        self.log_iot(f"⚠️ Checksum no coincide: esperado={checksum} actual={actual}")
-                                        try:
-                                            conn.sendall(b"ERR_CHECKSUM\n")
-                                        except Exception:
-                                            pass
-                                    else:
-                                        try:
-                                            conn.sendall(b"EOF_OK")
-                                        except Exception:
-                                            pass
-                                except Exception as ex:
-                                    self.log_iot(f"⚠️ No se pudo verificar checksum: {ex}")
-                                    try:
-                                        conn.sendall(b"EOF_OK")
-                                    except Exception:
-                                        pass
-
-                            except Exception as e:
-                                self.log_iot(f"❌ Error en transferencia de archivo: {e}")
-                                try:
-                                    conn.sendall(b"ERR_TRANSFER\n")
-                                except Exception:
-                                    pass
-
-                    except socket.timeout:
-                        continue
-                    except Exception as e:
-                        self.log_iot(f"❌ Error en servidor: {e}")
-                        continue
+    @staticmethod
+    async def _recv_header(loop, conn):
+        """
+        Lee la línea de encabezado por bloques (no byte a byte) y devuelve
+        (línea, bytes_sobrantes); los sobrantes pertenecen al contenido.
+        """
+        buf = bytearray()
+        while b"\n" not in buf and len(buf) < IOT_MAX_HEADER:
+            chunk = await loop.sock_recv(conn, 65536)
+            if not chunk:
+                break
+            buf += chunk
+        line, sep, rest = bytes(buf).partition(b"\n")
+        return line + sep, rest
 
-            self.server_running = False
-            self.log_iot("🛑 Servidor IoT detenido.")
+    async def _handle_iot_client(self, conn, addr, dest_dir, buffer_size=IOT_BUFFER_SIZE, idle=False):
+        """
+        Procesa el encabezado de un cliente IoT (ping o envío de archivo) y recibe el archivo.
+        Retorna True si el cliente pidió keep_alive y la transferencia terminó bien, es
+        decir, si la conexión debe seguir abierta para otra trama (`idle` en ese caso).
+        """
+        loop = asyncio.get_running_loop()
+        keep_open = False
+        try:
+            header_data, pending = await self._recv_header(loop, conn)
+        except Exception as e:
+            self.log_iot(f"❌ Error leyendo socket: {e}")
+            return
 
-        # Lanzar el hilo
-        self.server_thread = threading.Thread(target=server_loop, daemon=True)
-        self.server_thread.start()
+        async def recv(n):
+            # Primero se consumen los bytes que llegaron junto al encabezado
+            nonlocal pending
+            if pending:
+                data, pending = pending[:n], pending[n:]
+                return data
+            return await loop.sock_recv(conn, n)
+
+        if not header_data:
+            if not idle:  # en una conexión persistente es el cierre normal del cliente
+                self.log_iot("⚠️ Conexión vacía.")
+            return
+
+        header_text = header_data.decode(errors="replace").strip()
+
+        # Manejar pings enviados como texto simple
+        if header_text.lower() == "ping" or header_text.lower() == "ping\n":
+            self.log_iot(f"📡 Ping recibido (texto) desde {addr}")
+            await self._iot_reply(loop, conn, b"PONG\n")
+            return
+
+        # Intentar parsear JSON; si falla, responder y continuar
+        try:
+            header = json.loads(header_text)
+        except Exception as e:
+            self.log_iot(f"❌ Encabezado inválido (no JSON): {header_text!r} - {e}")
+            await self._iot_reply(loop, conn, b"ERR_INVALID_HEADER\n")
+            return
+
+        # --- Soportar ping enviado como JSON {"action":"ping"} ---
+        if isinstance(header, dict) and header.get("action") == "ping":
+            self.log_iot(f"📡 Ping JSON recibido desde {addr}")
+            await self._iot_reply(loop, conn, b"PONG\n")
+            return
+        # ----------------------------------------------------------------
+
+        # Validar keys mínimas para transferencia de archivos
+        if not all(k in header for k in ("filename", "size", "checksum")):
+            self.log_iot(f"❌ Encabezado incompleto: {header}")
+            await self._iot_reply(loop, conn, b"ERR_INCOMPLETE_HEADER\n")
+            return
+
+        serial = header.get("serial", "DESCONOCIDO")
+        self.log_iot(f"🔎 Dispositivo detectado: {serial}")
+
+        # Ejecutar sesión remota en un hilo (import dinámico tolerante)
+        try:
+            try:
+                from src.pstrace_connection import ejecutar_sesion_remota_iot
+            except Exception:
+                mod = importlib.import_module("pstrace_connection")
+                ejecutar_sesion_remota_iot = getattr(mod, "ejecutar_sesion_remota_iot")
+
+            method_params = {}  # personaliza según tu sensor
+            threading.Thread(
+                target=ejecutar_sesion_remota_iot,
+                args=(serial, method_params, None),
+                daemon=True
+            ).start()
+            self.log_iot(f"🔧 Sesión remota lanzada para {serial}")
+        except Exception as e:
+            self.log_iot(f"❌ Error ejecutando sesión remota para {serial}: {e}")
+
+        # Recibir archivo y verificar checksum
+        try:
+            filename = header["filename"]
+            size = int(header["size"])
+            checksum = header["checksum"]
+
+            filepath = os.path.join(dest_dir, filename)
+            # Confirmar que el servidor está listo para recibir; el flujo zstd solo se
+            # acepta si el emisor lo declaró en el encabezado y aquí se puede descomprimir
+            usar_zstd = header.get("encoding") == "zstd" and zstd is not None
+            await self._iot_reply(loop, conn, IOT_ACK_ZSTD if usar_zstd else b"ACK")
+
+            # Archivo sin buffer de Python: los bloques recibidos van directo a write(2)
+            with open(filepath, "wb", buffering=0) as f:
+                if usar_zstd:
+                    total_received = await self._recv_zstd(recv, f, size, buffer_size)
+                else:
+                    total_received = 0
+                    if pending:
+                        tail = await recv(size - total_received)
+                        f.write(tail)
+                        total_received += len(tail)
+                    # Búfer reutilizable: recv_into evita crear un objeto bytes por bloque
+                    buf = bytearray(buffer_size)
+                    mv = memoryview(buf)
+                    while total_received < size:
+                        # Nunca leer más allá de `size`: el emisor añade el marcador EOF
+                        n = await loop.sock_recv_into(conn, mv[:min(buffer_size, size - total_received)])
+                        if not n:
+                            break
+                        f.write(mv[:n])
+                        total_received += n
+
+            self.log_iot(f"✅ Archivo recibido: {filename} ({total_received/1e6:.2f} MB)")
+
+            # Verificar checksum (no fallar el servidor si algo sale mal); el hash se
+            # calcula fuera del bucle de eventos para no frenar otras transferencias
+            try:
+                actual = await asyncio.to_thread(sha256_file, filepath)
+            except Exception as ex:
+                self.log_iot(f"⚠️ No se pudo verificar checksum: {ex}")
+                actual = None
+
+            # Una única respuesta por transferencia (en keep-alive el cliente lee la siguiente)
+            if actual is not None and actual != checksum:
+                self.log_iot(f"⚠️ Checksum no coincide: esperado={checksum} actual={actual}")
+                await self._iot_reply(loop, conn, b"ERR_CHECKSUM\n")
+                return keep_open
+            await self._iot_reply(loop, conn, b"EOF_OK")
+            keep_open = actual is not None and bool(header.get("keep_alive"))
+
+            if actual is not None and header.get("encoding") == "gzip":
+                # El checksum cubre los bytes transmitidos; se descomprime tras verificar.
+                # Un fallo aquí ya no afecta al protocolo: se conserva el .gz y se registra
+                try:
+                    plain = await asyncio.to_thread(gunzip_file, filepath)
+                    self.log_iot(f"🗜️ Descomprimido: {os.path.basename(plain)}")
+                except Exception as ex:
+                    self.log_iot(f"⚠️ No se pudo descomprimir {filename} (se conserva comprimido): {ex}")
+
+        except Exception as e:
+            self.log_iot(f"❌ Error en transferencia de archivo: {e}")
+            await self._iot_reply(loop, conn, b"ERR_TRANSFER\n")
+            return False
+        return keep_open
+
+    @staticmethod
+    async def _recv_zstd(recv, f, size, buffer_size):
+        """Descomprime en flujo los datos zstd recibidos hacia `f` hasta completar `size` bytes."""
+        dobj = zstd.ZstdDecompressor().decompressobj()
+        written = 0
+        while written < size:
+            chunk = await recv(buffer_size)
+            if not chunk:
+                break
+            out = dobj.decompress(chunk)
+            f.write(out)
+            written += len(out)
+        return written
 
     def stop_iot_server(self):
-        """Detiene el servidor IoT embebido."""
+        """Detiene el servidor IoT embebido cancelando su tarea en el bucle de eventos."""
         if not self.server_running:
             self.log_iot("⚠️ El servidor no está activo.")
             return
-        self.server_running = False
+        # call_soon_threadsafe despierta al bucle por su self-pipe interno: el selector
+        # (epoll/kqueue) sale de inmediato, sin sondeo periódico de una bandera.
+        # La tarea se crea antes de arrancar el bucle, así que el callback siempre la encuentra
+        self._iot_loop.call_soon_threadsafe(lambda: self._iot_task.cancel())
         self.log_iot("🛑 Solicitando apagado del servidor...")
 
     def test_iot_connection(self):
@@ -1071,48 +1501,98 @@ class Aplicacion(tk.Tk):
 
         host = self.iot_ip_var.get()
         port = self.iot_port_var.get()
+        # El envío (checksum + socket) corre en un hilo para no bloquear el bucle de Tk;
+        # la interfaz se actualiza solo mediante self.after(...)
+        threading.Thread(
+            target=self._send_iot_file_worker,
+            args=(filepath, host, port),
+            daemon=True,
+        ).start()
+
+    def _set_iot_progress(self, value, maximum=None):
+        """Actualiza la barra de progreso IoT (invocar desde el hilo de Tk)."""
+        if maximum is not None:
+            self.iot_progress["maximum"] = maximum
+        self.iot_progress["value"] = value
+
+    def _send_iot_file_worker(self, filepath, host, port):
+        """Envía el archivo al servidor IoT; se ejecuta en un hilo secundario."""
         size = os.path.getsize(filepath)
         filename = os.path.basename(filepath)
 
-        import hashlib
-        checksum = hashlib.sha256(open(filepath, "rb").read()).hexdigest()
+        checksum = sha256_file(filepath)
 
-        header = json.dumps({
+        # Los .pssession (texto XML/JSON) se ofrecen comprimidos con zstd si está disponible;
+        # el receptor decide en su respuesta (IOT_ACK_ZSTD) si se envían así
+        ofrecer_zstd = (
+            zstd is not None
+            and filename.lower().endswith(".pssession")
+            and size >= ZSTD_MIN_SIZE
+        )
+        campos = {
             "action": "send_file",
             "filename": filename,
             "size": size,
             "checksum": checksum,
             # opcional: "serial": "MI_SERIAL"
-        }).encode() + b"\n"
+        }
+        if ofrecer_zstd:
+            campos["encoding"] = "zstd"
+        header = json.dumps(campos).encode() + b"\n"
 
         try:
             with socket.create_connection((host, port)) as s:
+                tune_iot_socket(s)
                 s.sendall(header)
-                ack = s.recv(8)
-                if ack != b"ACK":
+                with s.makefile("rb") as rf:
+                    ack = rf.read(3)  # read() en buffer completa los 3 bytes aunque lleguen partidos
+                if ack not in (b"ACK", IOT_ACK_ZSTD):
                     raise Exception(f"Servidor no aceptó la transferencia (ack={ack!r})")
+                compress = ofrecer_zstd and ack == IOT_ACK_ZSTD
+
+                self.after(0, self._set_iot_progress, 0, size)
+                # El progreso se publica como mucho a ~30 Hz (after_idle), no por bloque
+                last_ui = 0.0
 
-                self.iot_progress["value"] = 0
-                self.iot_progress["maximum"] = size
-                self.log_iot(f"📤 Enviando {filename} ({size/1e6:.2f} MB) a {host}:{port}")
+                def report(value):
+                    nonlocal last_ui
+                    now = time.monotonic()
+                    if now - last_ui >= PROGRESS_INTERVAL:
+                        last_ui = now
+                        self.after_idle(self._set_iot_progress, value)
+                self.after(0, self.log_iot, f"📤 Enviando {filename} ({size/1e6:.2f} MB) a {host}:{port}")
 
                 with open(filepath, "rb") as f:
-                    sent = 0
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        s.sendall(chunk)
-                        sent += len(chunk)
-                        self.iot_progress["value"] = sent
-                        self.update_idletasks()
-
-                self.log_iot("✅ Transferencia completada.")
-                try:
-                    s.sendall(b"EOF")
-                except Exception:
-                    pass
-                messagebox.showinfo("Éxito", f"Archivo {filename} enviado correctamente.")
+                    if compress:
+                        cctx = zstd.ZstdCompressor(level=ZSTD_LEVEL)
+                        for chunk in cctx.read_to_iter(f, read_size=1 << 20):
+                            s.sendall(chunk)
+                            report(f.tell())
+                    else:
+                        # socket.sendfile usa os.sendfile (archivo -> socket sin copiar a
+                        # espacio de usuario) y recurre a send() donde no existe. Se envía
+                        # por tramos de SENDFILE_CHUNK para poder reportar progreso.
+                        offset = 0
+                        while offset < size:
+                            sent = s.sendfile(f, offset, min(SENDFILE_CHUNK, size - offset))
+                            if not sent:
+                                break
+                            offset += sent
+                            report(offset)
+
+                self.after_idle(self._set_iot_progress, size)
+                self.after(0, self.log_iot, "✅ Transferencia completada." + (" (zstd)" if compress else ""))
+                if not compress:
+                    # El marcador EOF solo se conserva en el modo crudo: tras un flujo zstd
+                    # se mezclaría con el final de la trama comprimida
+                    try:
+                        s.sendall(b"EOF")
+                    except Exception:
+                        pass
+                self.after(0, messagebox.showinfo, "Éxito", f"Archivo {filename} enviado correctamente.")
         except Exception as e:
-            self.log_iot(f"❌ Error de envío: {e}")
-            messagebox.showerror("Error", str(e))
+            self.after(0, self.log_iot, f"❌ Error de envío: {e}")
+            self.after(0, messagebox.showerror, "Error", str(e))
 
     # ————— Bloque: Registrar mensajes en ventana de logs —————
     def log_message(self, msg):
@@ -1176,8 +1656,7 @@ class Aplicacion(tk.Tk):
         # Cargar límites desde JSON la primera vez
         if not hasattr(self, "limites_ppm"):
             try:
-                with open("limits_ppm.json", "r") as f:
-                    self.limites_ppm = json.load(f)
+                self._load_limits()
             except Exception as e:
                 print(f"[ERROR] Error cargando límites: {e}")
                 return  # No es posible continuar sin límites
@@ -1242,21 +1721,13 @@ class Aplicacion(tk.Tk):
             self.tree_ppm.heading(metal, text=metal)
         self.tree_ppm.delete(*self.tree_ppm.get_children())
 
-        # Poblar filas y resaltar alertas (comparando con límites en ppm)
-        for _, row in df.iterrows():
-            alerta = False
-            for metal in metales:
-                try:
-                    val = float(row[metal])
-                    limit = float(self.limites_ppm.get(metal, float('inf')))
-                    if val > limit:
-                        alerta = True
-                        break
-                except Exception:
-                    continue
-
+        # Poblar filas y resaltar alertas: una sola comparación matricial contra
+        # los límites (columnas en el mismo orden que self._limit_names)
+        vals = df.to_numpy(dtype=np.float64)
+        alertas = (vals > self._limit_vals).any(axis=1)
+        for values, alerta in zip(vals.tolist(), alertas.tolist()):
             tag = "alert" if alerta else ""
-            self.tree_ppm.insert("", "end", values=list(row), tags=(tag,))
+            self.tree_ppm.insert("", "end", values=values, tags=(tag,))
 
         self.tree_ppm.tag_configure("alert", background="#581845", foreground="white")
         ToolTip(
@@ -1264,6 +1735,22 @@ class Aplicacion(tk.Tk):
             "Tabla de estimaciones ppm; en rojo los valores que exceden el límite específico"
         )
 
+    def _load_limits(self, path="limits_ppm.json"):
+        """
+        Carga limits_ppm.json en self.limites_ppm y lo replica como arreglos paralelos
+        (self._limit_names, self._limit_vals) para comparar alertas de forma vectorizada.
+        Un límite no numérico se trata como infinito (nunca dispara alerta).
+        """
+        self.limites_ppm = read_json_file(path)
+        self._limit_names = np.array(list(self.limites_ppm.keys()))
+        vals = []
+        for v in self.limites_ppm.values():
+            try:
+                vals.append(float(v))
+            except (TypeError, ValueError):
+                vals.append(np.inf)
+        self._limit_vals = np.asarray(vals, dtype=np.float64)
+
     # ————— Bloque: Botón “Mostrar Clasificación” —————
     def show_classification(self):
         """
@@ -1278,41 +1765,24 @@ class Aplicacion(tk.Tk):
             messagebox.showwarning("Sin datos", "Carga primero un archivo .pssession")
             return
 
-        rows = []
-        for idx, m in self.current_data.iterrows():
-            # Preferir classification_group si existe; si no, inferir desde contamination_level
-            classification_group = m.get("classification_group")
-            nivel = m.get("contamination_level", 0.0)
-
-            try:
-                if classification_group is None or (isinstance(classification_group, float) and pd.isna(classification_group)):
-                    # Inferir a partir del nivel (se asume que 'nivel' es porcentaje respecto al límite)
-                    try:
-                        val = float(nivel)
-                    except Exception:
-                        val = 0.0
-                    if val >= 100:
-                        classification_group = 1
-                    elif val >= 65:
-                        classification_group = 2
-                    else:
-                        classification_group = 0
-                else:
-                    classification_group = int(classification_group)
-            except Exception:
-                classification_group = 0
-
-            if classification_group == 1:
-                estado = "⚠ CONTAMINACIÓN ALTA"
-            elif classification_group == 2:
-                estado = "⚡ CONTAMINACIÓN MEDIA"
-            else:
-                estado = "✅ SEGURO"
-
-            rows.append({
-                "Grupo": estado,
-                "Nivel (%)": f"{float(nivel):.2f}%"
-            })
+        # Vectorizado sobre columnas completas (sin iterrows):
+        # preferir classification_group si existe; si no, inferir desde contamination_level
+        # (se asume que el nivel es porcentaje respecto al límite)
+        df = self.current_data
+        nivel, cg = classify_levels(
+            df["contamination_level"] if "contamination_level" in df else np.zeros(len(df)),
+            df["classification_group"] if "classification_group" in df else None,
+        )
+        # En pantalla, nivel desconocido se muestra como 0 % y grupo desconocido como seguro
+        nivel = np.nan_to_num(nivel)
+        cg = np.nan_to_num(cg).astype(int)
+
+        estado = np.select(
+            [cg == 1, cg == 2],
+            ["⚠ CONTAMINACIÓN ALTA", "⚡ CONTAMINACIÓN MEDIA"],
+            default="✅ SEGURO",
+        )
+        niveles_txt = [f"{v:.2f}%" for v in nivel.tolist()]
 
         # Configurar columnas y poblar tree_ppm
         cols = ("Grupo", "Nivel (%)")
@@ -1322,12 +1792,10 @@ class Aplicacion(tk.Tk):
             self.tree_ppm.column(c, anchor="center")
 
         self.tree_ppm.delete(*self.tree_ppm.get_children())
-        self.ppm_df = pd.DataFrame(rows)
+        self.ppm_df = pd.DataFrame({"Grupo": estado, "Nivel (%)": niveles_txt})
 
-        for _, row in self.ppm_df.iterrows():
-            estado = row["Grupo"]
-            tag = "safe" if "SEGURO" in estado else "alert"
-            vals = (row["Grupo"], row["Nivel (%)"])
+        tags = np.where((cg == 1) | (cg == 2), "alert", "safe")
+        for vals, tag in zip(zip(estado.tolist(), niveles_txt), tags.tolist()):
             self.tree_ppm.insert("", "end", values=vals, tags=(tag,))
 
         self.tree_ppm.tag_configure("alert", background="#ffcdd2", foreground="#d32f2f")
@@ -1369,9 +1837,8 @@ class Aplicacion(tk.Tk):
         try:
             print(f"[DEBUG] Procesando archivo: {path}")
 
-            # 1) Importación corregida
-            from pstrace_session import extract_session_dict, cargar_limites_ppm as cargar_limites
-            print("[DEBUG] Módulo pstrace_session importado correctamente")
+            # 1) API de pstrace_session (importada una sola vez por proceso)
+            extract_session_dict, cargar_limites = pstrace_session_api()
 
             limites = cargar_limites()
             print(f"[DEBUG] Límites PPM cargados: {list(limites.keys()) if limites else 'No disponibles'}")
@@ -1382,63 +1849,72 @@ class Aplicacion(tk.Tk):
             print("[DEBUG] Datos de sesión extraídos correctamente")
 
             # 2) Guardar en la base de datos
-            conn = pg8000.connect(**DB_CONFIG)
-            cur = conn.cursor()
-            fname = os.path.basename(path)
-            now = datetime.datetime.now()
-
-            # Insertar session
-            cur.execute(
-                """
-                INSERT INTO sessions
-                  (filename, loaded_at, scan_rate, start_potential,
-                   end_potential, software_version)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    fname,
-                    now,
-                    data["session_info"].get("scan_rate"),
-                    data["session_info"].get("start_potential"),
-                    data["session_info"].get("end_potential"),
-                    data["session_info"].get("software_version"),
-                ),
-            )
-            sid = cur.fetchone()[0]
-            print(f"[DEBUG] Sesión insertada en BD. ID: {sid}")
+            with self._conn() as conn:
+                cur = conn.cursor()
+                fname = os.path.basename(path)
+                now = datetime.datetime.now()
 
-            # Insertar mediciones usando la clave correcta (pca_data o pca_scores)
-            for idx, m in enumerate(data["measurements"]):
-                # Identificar si la clave existe
-                pca_key = "pca_scores" if "pca_scores" in m else "pca_data"
+                # Insertar session
                 cur.execute(
                     """
-                    INSERT INTO measurements
-                      (session_id, title, timestamp, device_serial, curve_count, pca_scores)
+                    INSERT INTO sessions
+                      (filename, loaded_at, scan_rate, start_potential,
+                       end_potential, software_version)
                     VALUES (%s, %s, %s, %s, %s, %s)
+                    RETURNING id
                     """,
                     (
+                        fname,
+                        now,
+                        data["session_info"].get("scan_rate"),
+                        data["session_info"].get("start_potential"),
+                        data["session_info"].get("end_potential"),
+                        data["session_info"].get("software_version"),
+                    ),
+                )
+                sid = cur.fetchone()[0]
+                print(f"[DEBUG] Sesión insertada en BD. ID: {sid}")
+
+                # Insertar mediciones usando la clave correcta (pca_data o pca_scores);
+                # un único executemany en lugar de un execute por medición
+                # Clasificación en una sola pasada vectorizada; el bucle solo arma tuplas
+                meds = data["measurements"]
+                levels, groups = classify_levels(
+                    [m.get("contamination_level") for m in meds],
+                    [m.get("classification_group") for m in meds],
+                )
+                # Desconocidos como None (NULL): no cuentan como agua limpia en los promedios
+                levels_db = nullable(levels)
+                groups_db = nullable(groups, int)
+                rows = []
+                for m, level, group in zip(meds, levels_db, groups_db):
+                    rows.append((
                         sid,
                         m.get("title"),
                         m.get("timestamp"),
                         m.get("device_serial"),
                         m.get("curve_count"),
-                        m.get(pca_key),
-                    ),
-                )
-                print(f"[DEBUG] Medición {idx+1} insertada")
-
-            conn.commit()
-            conn.close()
+                        m.get("pca_scores" if "pca_scores" in m else "pca_data"),
+                        group,
+                        level,
+                    ))
+                insert_measurements(cur, rows)
+                print(f"[DEBUG] {len(rows)} mediciones insertadas")
+
+                conn.commit()
             print("[DEBUG] Datos guardados en BD")
 
-            # 3) Actualizar UI
+            # 3) Actualizar UI (columnas calculadas sobre el DataFrame, no sobre `data`)
             self.current_data = pd.DataFrame(data["measurements"])
+            if len(self.current_data):
+                self.current_data["contamination_level"] = levels
+                self.current_data["classification_group"] = pd.array(groups_db, dtype="Int64")
+            self._cache_scores()
             self.session_info = data["session_info"]
             self.session_info["session_id"] = sid
 
             self.log_message(f"Sesión {sid} cargada")
+            self.ensure_tabs("detail", "curve", "pca", "ppm")
             self.txt_detail.delete("1.0", "end")
             self.txt_detail.insert("end", json.dumps(self.session_info, indent=2, ensure_ascii=False))
 
@@ -1498,11 +1974,10 @@ class Aplicacion(tk.Tk):
         params.insert(0, self.settings["alert_threshold"])
 
         try:
-            conn = pg8000.connect(**DB_CONFIG)
-            cur = conn.cursor()
-            cur.execute(sql, tuple(params))
-            rows = cur.fetchall()
-            conn.close()
+            with self._conn() as conn:
+                cur = conn.cursor()
+                cur.execute(sql, tuple(params))
+                rows = cur.fetchall()
 
             self.tree.delete(*self.tree.get_children())
             for row in rows:
@@ -1520,24 +1995,28 @@ class Aplicacion(tk.Tk):
             print("[DEBUG] show_curve: sin datos o índice vacío")
             return
 
-        # Índice de medición seleccionado
+        # Índice de medición seleccionado; la fila sale de la matriz precalculada
         idx = int(self.cmb_curve.get())
-        arrs = self.current_data.at[idx, "pca_scores"] or []
-        n = len(arrs) // len(self.settings["cycles"]) if arrs else 1
-        curvas = [arrs[i * n : (i + 1) * n] for i in range(len(self.settings["cycles"]))]
-        x = list(range(n))
+        arrs = self._scores_mat[idx, : self._scores_len[idx]]
+        n_cycles = len(self.settings["cycles"])
+        n = len(arrs) // n_cycles
+        if n == 0:
+            print("[DEBUG] show_curve: la medición no tiene puntos suficientes")
+            return
+        curvas = arrs[: n_cycles * n].reshape(n_cycles, n)
+        x = np.arange(n)
 
         # Limpiar ejes
         self.ax_curve.clear()
+        limit_ticks(self.ax_curve)
 
         # Graficar curvas individuales
         for curve in curvas:
             self.ax_curve.plot(x, curve, alpha=0.3, linewidth=1)
 
-        # Promedio y desviación estándar
-        df = pd.DataFrame(curvas).T
-        mean = df.mean(axis=1)
-        std = df.std(axis=1)
+        # Promedio y desviación estándar (muestral, como pandas; 0 con un solo ciclo)
+        mean = curvas.mean(axis=0)
+        std = curvas.std(axis=0, ddof=1) if n_cycles > 1 else np.zeros(n, dtype=curvas.dtype)
         self.ax_curve.plot(x, mean, color="#e74c3c", linewidth=2, label="Promedio")
         self.ax_curve.fill_between(x, mean - std, mean + std, color="#e74c3c", alpha=0.2)
 
@@ -1567,30 +2046,22 @@ class Aplicacion(tk.Tk):
             print("[DEBUG] show_pca: sin datos")
             return
 
-        # Matriz de datos
-        df = pd.DataFrame(self.current_data["pca_scores"].tolist()).fillna(0)
-
-        # === Nuevo bloque: Cargar PCA entrenado ===
-        try:
-            from pathlib import Path
-            import joblib
-
-            pca_path = Path(__file__).resolve().parents[1] / "models" / "pca.pkl"
-            if pca_path.exists():
-                pca = joblib.load(pca_path)
-                print(f"[DEBUG] PCA cargado desde {pca_path}")
-                var = pca.explained_variance_ratio_.cumsum() * 100
-            else:
-                print("[WARNING] No se encontró el PCA entrenado. Recalculando localmente...")
-                pca = PCA().fit(df)
-                var = pca.explained_variance_ratio_.cumsum() * 100
-        except Exception as e:
-            print(f"[ERROR] No se pudo cargar el PCA entrenado: {e}")
-            pca = PCA().fit(df)
+        # El PCA ajustado se reutiliza mientras la sesión y su número de mediciones
+        # no cambien: los clics repetidos solo redibujan
+        key = (self.session_info.get("session_id"), len(self.current_data))
+        pca = self._pca_cache.get(key)
+        if pca is not None:
+            self._pca_cache.move_to_end(key)
             var = pca.explained_variance_ratio_.cumsum() * 100
+        else:
+            pca, var = self._fit_session_pca()
+            self._pca_cache[key] = pca
+            if len(self._pca_cache) > PCA_CACHE_SIZE:
+                self._pca_cache.popitem(last=False)  # descarta la sesión menos reciente
 
         # Limpiar ejes
         self.ax_pca.clear()
+        limit_ticks(self.ax_pca)
 
         # Graficar varianza acumulada
         self.ax_pca.plot(range(1, len(var) + 1), var, marker="o", linewidth=2)
@@ -1615,16 +2086,55 @@ class Aplicacion(tk.Tk):
         self.canvas_pca.draw()
         ToolTip(self.canvas_pca.get_tk_widget(), "Aquí ves la varianza acumulada de cada componente del PCA")
 
+    def _cache_scores(self):
+        """
+        Convierte una sola vez los pca_scores de la sesión actual en una matriz float32
+        contigua (self._scores_mat) con la longitud real de cada fila (self._scores_len);
+        show_curve y show_pca leen de ahí en lugar de la columna de objetos.
+        """
+        if self.current_data is not None and "pca_scores" in self.current_data:
+            scores = self.current_data["pca_scores"].to_numpy()
+        else:
+            scores = np.empty(0, dtype=object)
+        self._scores_mat = scores_matrix(scores)
+        self._scores_len = np.array([seq_len(v) for v in scores], dtype=np.intp)
+
+    def _fit_session_pca(self):
+        """
+        Obtiene el PCA a mostrar: el entrenado (models/pca.pkl) si existe o, si no,
+        uno ajustado sobre los pca_scores de la sesión actual.
+
+        Returns:
+            tuple: (pca, varianza acumulada en %)
+        """
+        # Matriz de datos (contigua, float32, precalculada al cargar la sesión)
+        X = self._scores_mat
+
+        # === Nuevo bloque: Cargar PCA entrenado ===
+        try:
+            import joblib
+
+            pca_path = Path(__file__).resolve().parents[1] / "models" / "pca.pkl"
+            if pca_path.exists():
+                pca = joblib.load(pca_path)
+                print(f"[DEBUG] PCA cargado desde {pca_path}")
+            else:
+                print("[WARNING] No se encontró el PCA entrenado. Recalculando localmente...")
+                pca = fit_local_pca(X)
+        except Exception as e:
+            print(f"[ERROR] No se pudo cargar el PCA entrenado: {e}")
+            pca = fit_local_pca(X)
+        return pca, pca.explained_variance_ratio_.cumsum() * 100
+
     # ——— Bloque: Pestaña “PCA” ———
     def build_pca_tab(self, parent):
         """
         Configura la pestaña 'PCA' para visualizar el análisis de componentes principales.
 
         Args:
-            parent (ttk.Notebook): Notebook donde se añade la pestaña.
+            parent (ttk.Frame): Marco de la pestaña creado por create_tabs.
         """
-        f = ttk.Frame(parent)
-        parent.add(f, text="📈 PCA")
+        f = parent
 
         btn_show_pca = ttk.Button(f, text="Mostrar PCA", command=self.show_pca)
         btn_show_pca.pack(pady=8)
@@ -1634,6 +2144,7 @@ class Aplicacion(tk.Tk):
         self.ax_pca.set_facecolor(COLOR_BG)
         self.ax_pca.tick_params(colors="white")
         self.ax_pca.grid(True, color="#5d6d7e")
+        limit_ticks(self.ax_pca)
         self.canvas_pca = FigureCanvasTkAgg(self.fig_pca, master=f)
         self.canvas_pca.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
         ToolTip(self.canvas_pca.get_tk_widget(), "Gráfica de varianza acumulada resultante del PCA")
@@ -1653,11 +2164,10 @@ class Aplicacion(tk.Tk):
         Carga en memoria la lista de IDs de sesiones registradas en la base de datos.
         """
         try:
-            conn = pg8000.connect(**DB_CONFIG)
-            cur = conn.cursor()
-            cur.execute("SELECT id FROM sessions")
-            _ = [r[0] for r in cur.fetchall()]
-            conn.close()
+            with self._conn() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT id FROM sessions")
+                _ = [r[0] for r in cur.fetchall()]
         except Exception as e:
             self.log_message(f"Error cargando sesiones: {e}")
 
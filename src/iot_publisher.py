@@ -29,6 +29,7 @@ class IoTPublisher:
         self._running = True
         # Suscribir a eventos relevantes
         event_manager.subscribe('cv_data_point', self._on_cv_data_point)
+        event_manager.subscribe('cv_data_batch', self._on_cv_data_batch)
         event_manager.subscribe('cv_config', self._on_cv_config)
         event_manager.subscribe('cv_measurement_complete', self._on_cv_complete)
         log.info("IoTPublisher started and subscribed to events")
@@ -39,6 +40,7 @@ class IoTPublisher:
         # No unsubscribe API public (DeviceEventManager supports unsubscribe)
         try:
             event_manager.unsubscribe('cv_data_point', self._on_cv_data_point)
+            event_manager.unsubscribe('cv_data_batch', self._on_cv_data_batch)
             event_manager.unsubscribe('cv_config', self._on_cv_config)
             event_manager.unsubscribe('cv_measurement_complete', self._on_cv_complete)
         except Exception:
@@ -51,6 +53,11 @@ class IoTPublisher:
         topic = f"{self.topic_root}/{event.device_id}/data_point"
         await self._publish(topic, payload)
 
+    async def _on_cv_data_batch(self, event: DeviceEvent):
+        payload = self._make_payload(event)
+        topic = f"{self.topic_root}/{event.device_id}/data_batch"
+        await self._publish(topic, payload)
+
     async def _on_cv_config(self, event: DeviceEvent):
         payload = self._make_payload(event)
         topic = f"{self.topic_root}/{event.device_id}/config"
@@ -73,7 +80,11 @@ class IoTPublisher:
     async def _publish(self, topic: str, payload: Dict[str, Any]):
         # For now append to memory and log. Replace with real broker code later.
         # Make JSON serialization tolerant to datetimes, numpy types, etc.
-        msg = json.dumps(payload, ensure_ascii=False, default=str)
+        # Las curvas llegan como arrays NumPy (SoA): se publican como listas; el 't0' de los
+        # lotes va en ISO para que el consumidor reconstruya t0 + t_ns
+        msg = json.dumps(payload, ensure_ascii=False,
+                         default=lambda o: o.tolist() if hasattr(o, 'tolist')
+                         else o.isoformat() if hasattr(o, 'isoformat') else str(o))
         self.published.append((topic, msg))
         log.debug("Published to %s: %s", topic, msg[:200])
 
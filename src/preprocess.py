@@ -7,29 +7,106 @@ import numpy as np
 import joblib
 from sklearn.preprocessing import StandardScaler
 
-def baseline_subtract(matrix, baseline_vector=None, method='col_min'):
+try:
+    import numba  # kernels paralelos para matrices grandes
+except ImportError:  # numba es opcional; se usan las rutas NumPy
+    numba = None
+
+# float32 basta para curvas voltamétricas y mueve la mitad de bytes que float64;
+# quien necesite doble precisión puede pasar dtype=np.float64.
+DEFAULT_DTYPE = np.float32
+
+
+# A partir de este número de elementos compensa lanzar los kernels Numba multihilo
+NUMBA_MIN_SIZE = 1 << 16
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _baseline_col_min_nb(X):
+        """Resta en sitio el mínimo de cada columna (paralelo por columnas y por filas)."""
+        n, m = X.shape
+        mn = np.empty(m, dtype=X.dtype)
+        for j in numba.prange(m):
+            v = X[0, j]
+            for i in range(1, n):
+                if X[i, j] < v:
+                    v = X[i, j]
+            mn[j] = v
+        for i in numba.prange(n):
+            for j in range(m):
+                X[i, j] -= mn[j]
+        return X
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _zscore_columns_nb(X):
+        """Z-score por columna en sitio; devuelve (media, escala) con escala 1 si std == 0."""
+        n, m = X.shape
+        mean = np.empty(m, dtype=X.dtype)
+        scale = np.empty(m, dtype=X.dtype)
+        for j in numba.prange(m):
+            s = 0.0
+            for i in range(n):
+                s += X[i, j]
+            mu = s / n
+            ss = 0.0
+            for i in range(n):
+                d = X[i, j] - mu
+                ss += d * d
+            sd = np.sqrt(ss / n)
+            mean[j] = mu
+            scale[j] = sd if sd != 0 else 1.0
+        for i in numba.prange(n):
+            for j in range(m):
+                X[i, j] = (X[i, j] - mean[j]) / scale[j]
+        return mean, scale
+else:
+    _baseline_col_min_nb = None
+    _zscore_columns_nb = None
+
+
+def _work_array(matrix, copy, dtype=DEFAULT_DTYPE):
+    """
+    Devuelve la matriz de trabajo en `dtype`.
+    copy=True: siempre una copia nueva (la entrada no se modifica).
+    copy=False: reutiliza `matrix` si ya tiene ese dtype y es escribible; las
+    operaciones siguientes la modifican en sitio.
+    """
+    if copy:
+        return np.array(matrix, dtype=dtype)
+    X = np.asarray(matrix, dtype=dtype)
+    if not X.flags.writeable:
+        X = X.copy()
+    return X
+
+
+def baseline_subtract(matrix, baseline_vector=None, method='col_min', copy=True, dtype=DEFAULT_DTYPE):
     """
     matrix: np.ndarray (n_samples, n_points)
     baseline_vector: np.ndarray (n_points,) - si la tienes (blanco)
     method: 'col_min' | 'row_mean' | 'none'
+    copy: si False y `matrix` es un ndarray de tipo `dtype`, la resta se hace en sitio
+    dtype: tipo de trabajo (float32 por defecto)
     Retorna: np.ndarray con baseline restado
     """
-    X = np.array(matrix, dtype=float)
+    X = _work_array(matrix, copy, dtype)
     if baseline_vector is not None:
-        bv = np.array(baseline_vector, dtype=float)
+        bv = np.asarray(baseline_vector, dtype=dtype)
         if bv.shape[0] != X.shape[1]:
             raise ValueError("baseline_vector debe tener longitud igual al número de columnas (potenciales)")
-        return X - bv.reshape(1, -1)
+        return np.subtract(X, bv, out=X)
     if method == 'col_min':
-        return X - X.min(axis=0, keepdims=True)
+        if _baseline_col_min_nb is not None and X.ndim == 2 and X.size >= NUMBA_MIN_SIZE:
+            return _baseline_col_min_nb(X)
+        # El mínimo (m,) se difunde por filas: sin keepdims ni temporales de tamaño X
+        return np.subtract(X, X.min(axis=0), out=X)
     if method == 'row_mean':
-        return X - X.mean(axis=1, keepdims=True)
+        return np.subtract(X, X.mean(axis=1)[:, np.newaxis], out=X)
     return X  # 'none'
 
-def fit_scaler(X):
-    """Ajusta un StandardScaler (z-score por columna)."""
+def fit_scaler(X, dtype=DEFAULT_DTYPE):
+    """Ajusta un StandardScaler (z-score por columna); el scaler conserva el dtype de X."""
     scaler = StandardScaler(with_mean=True, with_std=True)
-    scaler.fit(X)
+    scaler.fit(np.asarray(X, dtype=dtype))
     return scaler
 
 def apply_scaler(X, scaler):
@@ -42,7 +119,8 @@ def load_artifact(path):
     return joblib.load(path)
 
 
-def normalize_for_pca(X, *, baseline_vector=None, scaler=None, method='use_trained_scaler', return_scaler=False):
+def normalize_for_pca(X, *, baseline_vector=None, scaler=None, method='use_trained_scaler', return_scaler=False,
+                      copy=True, dtype=DEFAULT_DTYPE):
     """
     Normaliza matriz X para PCA según el método solicitado.
 
@@ -52,10 +130,12 @@ def normalize_for_pca(X, *, baseline_vector=None, scaler=None, method='use_train
       - scaler: objeto tipo sklearn scaler (usado si method=='use_trained_scaler')
       - method: 'use_trained_scaler' | 'zscore_columns' | 'center_only'
       - return_scaler: si True y method='use_trained_scaler' devuelve también el scaler
+      - copy: si False y X es un ndarray de tipo `dtype`, baseline y z-score se aplican en sitio
+      - dtype: tipo de trabajo (float32 por defecto; np.float64 si se necesita doble precisión)
 
     Retorna: (X_normalized, meta) o (X_normalized, meta, scaler) si return_scaler True
     """
-    X = np.array(X, dtype=float)
+    X = _work_array(X, copy, dtype)
     if X.ndim == 1:
         X = X.reshape(1, -1)
 
@@ -64,23 +144,30 @@ def normalize_for_pca(X, *, baseline_vector=None, scaler=None, method='use_train
 
     # Baseline handling: pad or truncate baseline_vector to match n_features
     if baseline_vector is not None:
-        bv = np.array(baseline_vector, dtype=float).reshape(-1)
+        bv = np.asarray(baseline_vector, dtype=dtype).reshape(-1)
         if bv.shape[0] < n_features:
             # pad with zeros
-            bv = np.concatenate([bv, np.zeros(n_features - bv.shape[0], dtype=float)])
+            bv = np.concatenate([bv, np.zeros(n_features - bv.shape[0], dtype=dtype)])
         elif bv.shape[0] > n_features:
             bv = bv[:n_features]
-        X = X - bv.reshape(1, -1)
+        np.subtract(X, bv[np.newaxis, :], out=X)
         meta['used_baseline'] = True
         meta['baseline_length'] = int(len(bv))
 
     if method == 'zscore_columns':
-        # Column-wise z-score
-        mean = X.mean(axis=0)
-        std = X.std(axis=0)
-        # avoid division by zero
-        std_fixed = np.where(std == 0, 1.0, std)
-        Xs = (X - mean.reshape(1, -1)) / std_fixed.reshape(1, -1)
+        # Column-wise z-score, fusionado: se centra en sitio una sola vez y la varianza
+        # sale de la suma de cuadrados del bloque ya centrado (einsum no crea
+        # temporales), en lugar de X.std() que recalcula la media y copia X.
+        if _zscore_columns_nb is not None and X.size >= NUMBA_MIN_SIZE:
+            Xs = X
+            mean, std_fixed = _zscore_columns_nb(Xs)
+        else:
+            mean = X.mean(axis=0)
+            Xs = np.subtract(X, mean[np.newaxis, :], out=X)
+            std = np.sqrt(np.einsum('ij,ij->j', Xs, Xs) / n_samples)
+            # avoid division by zero
+            std_fixed = np.where(std == 0, X.dtype.type(1.0), std)
+            np.divide(Xs, std_fixed[np.newaxis, :], out=Xs)
         meta.update({'mean': mean.tolist(), 'scale': std_fixed.tolist()})
         meta['method'] = 'zscore_columns'
         if return_scaler:
@@ -103,7 +190,7 @@ def normalize_for_pca(X, *, baseline_vector=None, scaler=None, method='use_train
 
     if method == 'center_only':
         mean = X.mean(axis=0)
-        Xs = X - mean.reshape(1, -1)
+        Xs = np.subtract(X, mean[np.newaxis, :], out=X)
         meta['method'] = 'center_only'
         meta.update({'mean': mean.tolist()})
         return Xs, meta
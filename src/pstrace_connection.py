@@ -73,16 +73,50 @@ except Exception as e:
 
 from typing import List, Dict
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from enum import Enum
 import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+import errno
+import select
+import socket
 
 class TransportType(Enum):
     USB = "USB"
     BLUETOOTH = "Bluetooth" 
     TCP = "TCP"
 
-@dataclass
+# Funciones del SDK resueltas una sola vez al importar el módulo
+try:
+    import pspymethods as _pspymethods
+except ImportError:
+    _pspymethods = None
+
+_LIST = {
+    TransportType.USB: getattr(_pspymethods, "list_usb_devices", None),
+    TransportType.BLUETOOTH: getattr(_pspymethods, "list_bluetooth_devices", None),
+    TransportType.TCP: getattr(_pspymethods, "list_tcp_endpoints", None)
+}
+def _conectar_tcp(address: str, timeout_ms: int):
+    """Adapta connect_tcp(host, port, timeout) a la firma común (address, timeout)."""
+    host, port = address.split(':')
+    return _pspymethods.connect_tcp(host, int(port), timeout_ms)
+
+# Tabla de conexión con firma uniforme (address, timeout_ms), indexada por valor de transporte
+_CONNECT = {
+    TransportType.USB.value: getattr(_pspymethods, "connect_usb", None),
+    TransportType.BLUETOOTH.value: getattr(_pspymethods, "connect_bluetooth", None),
+    TransportType.TCP.value: _conectar_tcp if getattr(_pspymethods, "connect_tcp", None) else None
+}
+# Multiplicador del timeout de conexión por transporte (Bluetooth necesita más tiempo)
+_TRANSPORT_TIMEOUT_MULT = {
+    TransportType.USB.value: 1,
+    TransportType.BLUETOOTH.value: 2,
+    TransportType.TCP.value: 1
+}
+
+@dataclass(slots=True, frozen=True)
 class DeviceInfo:
     name: str
     serial: str = None 
@@ -90,10 +124,34 @@ class DeviceInfo:
     address: str = None
     status: str = "unknown"
 
-def descubrir_instrumentos() -> List[Dict]:
+# Caché de descubrimiento: clave (early_exit_serial, probe) -> (timestamp monotónico, dispositivos)
+_DISCOVERY_CACHE: Dict = {}
+_DISCOVERY_TTL = 5.0
+# Direcciones vistas en escaneos anteriores (para emitir 'device_added' solo con equipos nuevos).
+# Se vacía junto con la caché: un equipo que vuelve tras una desconexión cuenta como nuevo
+_DISPOSITIVOS_VISTOS = set()
+
+def _invalidar_cache_descubrimiento():
+    """Descarta los escaneos cacheados y los equipos vistos (desconexión o fallo del transporte)."""
+    _DISCOVERY_CACHE.clear()
+    _DISPOSITIVOS_VISTOS.clear()
+
+def descubrir_instrumentos(timeout_per_transport: float = 1.5,
+                           early_exit_serial: str = None,
+                           force: bool = False,
+                           probe: bool = False) -> List[Dict]:
     """
     Descubre instrumentos disponibles (USB, Bluetooth, TCP).
-    
+
+    Args:
+        timeout_per_transport (float): Tiempo máximo (s) por transporte; Bluetooth
+            dispone del doble al ser el más lento en responder.
+        early_exit_serial (str, optional): Serial o address buscado; en cuanto un
+            transporte lo devuelve se cancelan los restantes.
+        force (bool): Ignora la caché y fuerza un nuevo escaneo del SDK.
+        probe (bool): Verifica en paralelo la conectividad de cada dispositivo
+            y descarta los que no responden.
+
     Returns:
         List[Dict]: Lista de dispositivos encontrados con formato:
         {
@@ -107,69 +165,129 @@ def descubrir_instrumentos() -> List[Dict]:
     Raises:
         RuntimeError: Si hay error crítico al cargar SDK
     """
+    cache_key = (early_exit_serial, probe)
+    cached = _DISCOVERY_CACHE.get(cache_key)
+    if not force and cached and time.monotonic() - cached[0] < _DISCOVERY_TTL:
+        # Copias: conectar_instrumento modifica el dict seleccionado
+        return [dict(d) for d in cached[1]]
+
     dispositivos = []
     try:
-        import pspymethods
+        if _pspymethods is None:
+            raise ImportError("No module named 'pspymethods'")
         log = logging.getLogger(__name__)
 
-        # Diccionario de métodos de descubrimiento
-        discovery_methods = {
-            TransportType.USB: getattr(pspymethods, "list_usb_devices", None),
-            TransportType.BLUETOOTH: getattr(pspymethods, "list_bluetooth_devices", None),
-            TransportType.TCP: getattr(pspymethods, "list_tcp_endpoints", None)
-        }
+        # Métodos de descubrimiento precalculados al importar
+        discovery_methods = _LIST
 
-        # Intentar cada método de descubrimiento
+        # Lanzar los métodos de descubrimiento en paralelo (llamadas bloqueantes de E/S)
         for transport_type, discovery_method in discovery_methods.items():
             if discovery_method is None:
-                log.warning(f"Método de descubrimiento no disponible para {transport_type.value}")
-                continue
-
-            try:
-                device_list = discovery_method()
-                
-                # Procesar dispositivos encontrados
-                for dev in device_list:
-                    device_info = DeviceInfo(
-                        name=getattr(dev, 'Name', 'PalmSens'),
-                        serial=getattr(dev, 'SerialNumber', None),
-                        transport=transport_type,
-                        address=_get_device_address(dev, transport_type),
-                        status='available'
-                    )
-                    
-                    if _validar_dispositivo(device_info):
-                        dispositivos.append(device_info.__dict__)
-                    else:
-                        log.warning(f"Dispositivo inválido encontrado: {device_info}")
+                log.warning("Método de descubrimiento no disponible para %s", transport_type.value)
 
-            except Exception as e:
-                log.error(f"Error descubriendo dispositivos {transport_type.value}: {str(e)}")
-                continue
+        # No se usa 'with': su salida esperaría a los hilos colgados del SDK
+        ex = ThreadPoolExecutor(max_workers=3)
+        try:
+            futures = {ex.submit(m): t for t, m in discovery_methods.items() if m}
+            start = time.monotonic()
+            deadlines = {
+                f: start + timeout_per_transport * (2 if t is TransportType.BLUETOOTH else 1)
+                for f, t in futures.items()
+            }
+            pending = set(futures)
+
+            while pending:
+                now = time.monotonic()
+                for future in [f for f in pending if deadlines[f] <= now]:
+                    pending.discard(future)
+                    log.warning("Timeout descubriendo dispositivos %s", futures[future].value)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, timeout=min(deadlines[f] for f in pending) - now,
+                               return_when=FIRST_COMPLETED)
+                encontrado = False
+                for future in done:
+                    pending.discard(future)
+                    transport_type = futures[future]
+                    try:
+                        nuevos = _normalizar_dispositivos(future.result(), transport_type)
+                    except Exception as e:
+                        log.error("Error descubriendo dispositivos %s: %s", transport_type.value, e)
+                        continue
+                    dispositivos.extend(nuevos)
+                    if early_exit_serial and any(
+                            early_exit_serial in (d['serial'], d['address']) for d in nuevos):
+                        encontrado = True
+
+                if encontrado:
+                    log.debug("Dispositivo %s encontrado; se cancelan los transportes restantes", early_exit_serial)
+                    break
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+        if probe and dispositivos:
+            resultados = _probe_all(dispositivos)
+            dispositivos = [d for d, ok in zip(dispositivos, resultados) if ok]
 
         # Logging detallado del resultado
-        log.info(f"✓ Descubiertos {len(dispositivos)} dispositivos")
+        log.info("✓ Descubiertos %d dispositivos", len(dispositivos))
+        if log.isEnabledFor(logging.DEBUG):
+            for dev in dispositivos:
+                log.debug("Dispositivo encontrado: %s", dev)
+
+        # Equipos no vistos antes: despierta a quien espere en conectar_con_reintentos
         for dev in dispositivos:
-            log.debug(f"Dispositivo encontrado: {dev}")
-            
+            if dev['address'] not in _DISPOSITIVOS_VISTOS:
+                _DISPOSITIVOS_VISTOS.add(dev['address'])
+                event_manager.emit_nowait('device_added', dict(dev), dev['serial'] or dev['address'])
+
+        # Solo se cachean escaneos con resultados para no retrasar la detección de un equipo recién conectado
+        if dispositivos:
+            _DISCOVERY_CACHE[cache_key] = (time.monotonic(), [dict(d) for d in dispositivos])
         return dispositivos
 
     except ImportError as e:
-        log.critical(f"✗ Error crítico: No se pudo cargar SDK PalmSens: {str(e)}")
+        log.critical("✗ Error crítico: No se pudo cargar SDK PalmSens: %s", e)
         raise RuntimeError("SDK PalmSens no disponible") from e
     except Exception as e:
         log.exception("✗ Error durante la descubierta de instrumentos")
         return []
 
+def _normalizar_dispositivos(device_list, transport_type: TransportType) -> List[Dict]:
+    """Convierte los objetos del SDK en diccionarios DeviceInfo válidos"""
+    dispositivos = []
+    for dev in device_list:
+        device_info = DeviceInfo(
+            name=getattr(dev, 'Name', 'PalmSens'),
+            serial=getattr(dev, 'SerialNumber', None),
+            transport=transport_type,
+            address=_get_device_address(dev, transport_type),
+            status='available'
+        )
+
+        if _validar_dispositivo(device_info):
+            # Con slots no hay __dict__: el dict se crea solo en la frontera de la API
+            dispositivos.append(asdict(device_info))
+        else:
+            log.warning("Dispositivo inválido encontrado: %s", device_info)
+    return dispositivos
+
+# Atributo del objeto SDK y prefijo de la dirección por transporte
+_ADDR_FIELDS = {
+    TransportType.USB: ('PortName', ''),
+    TransportType.BLUETOOTH: ('Address', 'BT:'),
+    TransportType.TCP: ('Endpoint', '')
+}
+
 def _get_device_address(dev, transport_type: TransportType) -> str:
     """Obtiene la dirección formateada según el tipo de transporte"""
-    if transport_type == TransportType.USB:
-        return getattr(dev, 'PortName', None)
-    elif transport_type == TransportType.BLUETOOTH:
-        return f"BT:{getattr(dev, 'Address', None)}"
-    elif transport_type == TransportType.TCP:
-        return getattr(dev, 'Endpoint', None)
-    return None
+    campo = _ADDR_FIELDS.get(transport_type)
+    if campo is None:
+        return None
+    attr, prefix = campo
+    valor = getattr(dev, attr, None)
+    return None if valor is None else f"{prefix}{valor}"
 
 def _validar_dispositivo(device_info: DeviceInfo) -> bool:
     """Valida que el dispositivo tenga los campos mínimos necesarios"""
@@ -179,6 +297,40 @@ def _validar_dispositivo(device_info: DeviceInfo) -> bool:
         device_info.address is not None
     ])
 
+PROBE_TIMEOUT = 0.3  # s por sonda TCP
+
+def _sonda_tcp(address: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """
+    Comprueba si host:port acepta conexiones con un connect_ex no bloqueante
+    y select; no crea tareas asyncio ni streams.
+    """
+    host, port = address.rsplit(':', 1)
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setblocking(False)
+    try:
+        err = s.connect_ex((host, int(port)))
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            return False
+        _, writable, _ = select.select([], [s], [], timeout)
+        # Escribible también indica un rechazo: SO_ERROR distingue el caso
+        return bool(writable) and s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+    finally:
+        s.close()
+
+def _verificar_dispositivo(device_info: Dict, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Versión síncrona de verificar_conectividad_dispositivo."""
+    try:
+        # Implementar verificación según tipo de transporte
+        if getattr(device_info['transport'], 'value', device_info['transport']) == TransportType.TCP.value:
+            return _sonda_tcp(device_info['address'], timeout)
+
+        # Para USB y Bluetooth podemos asumir que si fueron detectados están disponibles
+        return True
+
+    except Exception as e:
+        logging.error("Error verificando dispositivo %s: %s", device_info['name'], e)
+        return False
+
 async def verificar_conectividad_dispositivo(device_info: Dict) -> bool:
     """
     Verifica que el dispositivo esté realmente disponible
@@ -189,28 +341,22 @@ async def verificar_conectividad_dispositivo(device_info: Dict) -> bool:
     Returns:
         bool: True si el dispositivo responde, False en caso contrario
     """
-    try:
-        # Implementar verificación según tipo de transporte
-        if device_info['transport'] == TransportType.TCP.value:
-            host, port = device_info['address'].split(':')
-            reader, writer = await asyncio.open_connection(host, int(port))
-            writer.close()
-            await writer.wait_closed()
-            return True
-            
-        # Para USB y Bluetooth podemos asumir que si fueron detectados están disponibles
-        return True
-        
-    except Exception as e:
-        logging.error(f"Error verificando dispositivo {device_info['name']}: {str(e)}")
-        return False
-    
+    return await asyncio.to_thread(_verificar_dispositivo, device_info)
+
+def _probe_all(devs: List[Dict], timeout: float = PROBE_TIMEOUT) -> List[bool]:
+    """Verifica todos los dispositivos a la vez (~1 RTT en lugar de N×RTT)."""
+    with ThreadPoolExecutor(max_workers=min(8, len(devs))) as ex:
+        return list(ex.map(lambda d: _verificar_dispositivo(d, timeout), devs))
 
 # ===================================================================================
 # BLOQUE 3: CONEXIÓN Y DESCONEXIÓN DE INSTRUMENTOS
 # ===================================================================================
 
 import asyncio
+import functools
+import random
+import threading
+import weakref
 from typing import Optional, Dict
 from contextlib import contextmanager
 
@@ -220,24 +366,52 @@ class PalmSensConnectionError(Exception):
 
 class ConnectionManager:
     """Gestor de conexiones para mantener estado y reconexión"""
-    _instance = None
-    _active_connections = {}
-    
+
+    def __init__(self):
+        # Mutado desde el bucle de eventos y desde hilos (asyncio.to_thread): siempre bajo _lock.
+        # RLock porque el callback del weakref puede dispararse (GC) con el lock ya tomado
+        self._lock = threading.RLock()
+        self._active_connections = {}
+
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = ConnectionManager()
-        return cls._instance
+        return _connection_manager()
     
     def register_connection(self, device_id: str, connection):
-        self._active_connections[device_id] = {
-            'connection': connection,
-            'last_heartbeat': asyncio.get_event_loop().time(),
-            'reconnect_attempts': 0
-        }
+        # Referencia débil: el gestor no mantiene vivo un handle del SDK que ya nadie usa
+        try:
+            ref = weakref.ref(connection, lambda r, d=device_id: self._descartar(d, r))
+        except TypeError:
+            # Objetos sin soporte de weakref (p. ej. algunos proxies .NET): referencia fuerte
+            ref = lambda c=connection: c
+        with self._lock:
+            self._active_connections[device_id] = {
+                'connection': ref,
+                'last_heartbeat': time.monotonic(),
+                'reconnect_attempts': 0
+            }
+
+    def get_connection(self, device_id: str):
+        """Devuelve el objeto de conexión registrado o None si ya no existe."""
+        with self._lock:
+            entry = self._active_connections.get(device_id)
+        return entry['connection']() if entry else None
     
     def remove_connection(self, device_id: str):
-        self._active_connections.pop(device_id, None)
+        with self._lock:
+            self._active_connections.pop(device_id, None)
+
+    def _descartar(self, device_id: str, ref):
+        """Callback del weakref: elimina la entrada solo si sigue apuntando a ese objeto."""
+        with self._lock:
+            entry = self._active_connections.get(device_id)
+            if entry and entry['connection'] is ref:
+                del self._active_connections[device_id]
+
+@functools.cache
+def _connection_manager() -> ConnectionManager:
+    """Instancia única de ConnectionManager, creada en la primera llamada."""
+    return ConnectionManager()
 
 @contextmanager
 def connection_context(device_id: str, connection):
@@ -251,21 +425,56 @@ def connection_context(device_id: str, connection):
 
 async def check_device_health(instrumento) -> bool:
     """Verifica el estado de salud del dispositivo"""
+    # run_in_executor directo: no hace falta copiar contextvars como en asyncio.to_thread
+    loop = asyncio.get_running_loop()
     try:
-        estado = await asyncio.to_thread(estado_instrumento, instrumento)
+        estado = await loop.run_in_executor(None, estado_instrumento, instrumento)
         return estado['connected'] and not estado['last_error']
     except Exception:
         return False
 
+# Bucle asyncio persistente (conexión, salud, medición): evita crear y destruir
+# un bucle (con su executor) en cada llamada desde código síncrono
+_HEALTH_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_HEALTH_LOOP.run_forever, name="palmsens-health", daemon=True).start()
+
+def _backoff_full_jitter(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Backoff exponencial con 'full jitter': uniforme en [0, min(cap, base·2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def _ejecutar_en_bucle(coro, timeout: float = None):
+    """Ejecuta una corrutina en _HEALTH_LOOP desde un hilo síncrono y espera su resultado."""
+    return asyncio.run_coroutine_threadsafe(coro, _HEALTH_LOOP).result(timeout=timeout)
+
 def conectar_instrumento(serial: str = None,
                          transport: str = None,
                          address: str = None,
                          timeout_ms: int = 10000,
                          max_retries: int = 3,
-                         retry_delay: float = 1.0):
+                         retry_delay: float = 1.0,
+                         force_discovery: bool = False,
+                         backoff_cap: float = 30.0):
+    """
+    Envoltorio síncrono de conectar_instrumento_async (mismos argumentos),
+    ejecutado en el bucle persistente del módulo.
+    """
+    return _ejecutar_en_bucle(conectar_instrumento_async(
+        serial=serial, transport=transport, address=address, timeout_ms=timeout_ms,
+        max_retries=max_retries, retry_delay=retry_delay, force_discovery=force_discovery,
+        backoff_cap=backoff_cap))
+
+async def conectar_instrumento_async(serial: str = None,
+                                     transport: str = None,
+                                     address: str = None,
+                                     timeout_ms: int = 10000,
+                                     max_retries: int = 3,
+                                     retry_delay: float = 1.0,
+                                     force_discovery: bool = False,
+                                     backoff_cap: float = 30.0):
     """
     Conecta con un instrumento PalmSens usando serial o address.
-    Retorna el objeto 'instrumento' del SDK.
+    Retorna el objeto 'instrumento' del SDK. Las llamadas bloqueantes del SDK
+    (descubrimiento y conexión) se delegan a hilos con asyncio.to_thread.
     
     Args:
         serial (str, optional): Número de serie del dispositivo
@@ -273,7 +482,9 @@ def conectar_instrumento(serial: str = None,
         address (str, optional): Dirección del dispositivo
         timeout_ms (int): Timeout en milisegundos
         max_retries (int): Número máximo de intentos de conexión
-        retry_delay (float): Tiempo entre reintentos en segundos
+        retry_delay (float): Base del backoff exponencial entre reintentos (s)
+        force_discovery (bool): Ignora la caché de descubrimiento
+        backoff_cap (float): Espera máxima entre reintentos (s)
     
     Returns:
         Object: Objeto instrumento del SDK
@@ -281,64 +492,57 @@ def conectar_instrumento(serial: str = None,
     Raises:
         PalmSensConnectionError: Si la conexión falla después de todos los reintentos
     """
-    dispositivos = descubrir_instrumentos()
-    if not dispositivos:
-        raise PalmSensConnectionError("No hay instrumentos disponibles.")
-
-    # Selección del dispositivo
-    objetivo = None
-    if serial:
-        matches = [d for d in dispositivos if d.get('serial') == serial]
-        if not matches:
-            raise PalmSensConnectionError(f"No se encontró instrumento con serial {serial}.")
-        objetivo = matches[0]
-    elif address:
-        matches = [d for d in dispositivos if d.get('address') == address]
-        if not matches:
-            raise PalmSensConnectionError(f"No se encontró instrumento con address {address}.")
-        objetivo = matches[0]
+    if transport and address:
+        # Endpoint completamente especificado: conexión directa sin escanear
+        objetivo = {'name': 'PalmSens', 'serial': serial,
+                    'transport': transport, 'address': address}
     else:
-        objetivo = dispositivos[0]  # fallback: primer dispositivo
+        dispositivos = await asyncio.to_thread(descubrir_instrumentos,
+                                               early_exit_serial=serial or address,
+                                               force=force_discovery)
+        if not dispositivos:
+            raise PalmSensConnectionError("No hay instrumentos disponibles.")
+
+        # Selección del dispositivo
+        objetivo = None
+        if serial:
+            matches = [d for d in dispositivos if d.get('serial') == serial]
+            if not matches:
+                raise PalmSensConnectionError(f"No se encontró instrumento con serial {serial}.")
+            objetivo = matches[0]
+        elif address:
+            matches = [d for d in dispositivos if d.get('address') == address]
+            if not matches:
+                raise PalmSensConnectionError(f"No se encontró instrumento con address {address}.")
+            objetivo = matches[0]
+        else:
+            objetivo = dispositivos[0]  # fallback: primer dispositivo
+
+        if transport:
+            objetivo['transport'] = transport
 
-    if transport:
-        objetivo['transport'] = transport
+    # El descubrimiento entrega TransportType; las tablas se indexan por su valor
+    transporte = getattr(objetivo['transport'], 'value', objetivo['transport'])
+    connect = _CONNECT.get(transporte)
+    current_timeout = timeout_ms * _TRANSPORT_TIMEOUT_MULT.get(transporte, 1)
 
-    log.info(f"→ Conectando a {objetivo['name']} "
-             f"serial={objetivo.get('serial')} "
-             f"via {objetivo['transport']} @ {objetivo.get('address')}")
+    log.info("→ Conectando a %s serial=%s via %s @ %s",
+             objetivo['name'], objetivo.get('serial'), transporte, objetivo.get('address'))
 
     last_exception = None
     for attempt in range(max_retries):
         try:
-            import pspymethods
-            instrumento = None
-
-            # Timeouts específicos por tipo de transporte
-            transport_timeouts = {
-                'USB': timeout_ms,
-                'Bluetooth': timeout_ms * 2,  # Bluetooth necesita más tiempo
-                'TCP': timeout_ms
-            }
-            
-            current_timeout = transport_timeouts.get(objetivo['transport'], timeout_ms)
-
             # Ajusta a los métodos reales de tu SDK
-            if objetivo['transport'] == 'USB' and hasattr(pspymethods, "connect_usb"):
-                instrumento = pspymethods.connect_usb(objetivo['address'], current_timeout)
-            elif objetivo['transport'] == 'Bluetooth' and hasattr(pspymethods, "connect_bluetooth"):
-                instrumento = pspymethods.connect_bluetooth(objetivo['address'], current_timeout)
-            elif objetivo['transport'] == 'TCP' and hasattr(pspymethods, "connect_tcp"):
-                host, port = objetivo['address'].split(':')
-                instrumento = pspymethods.connect_tcp(host, int(port), current_timeout)
-            else:
-                raise PalmSensConnectionError(f"Transporte no soportado o método no disponible: {objetivo['transport']}")
+            if connect is None:
+                raise PalmSensConnectionError(f"Transporte no soportado o método no disponible: {transporte}")
+            instrumento = await asyncio.to_thread(connect, objetivo['address'], current_timeout)
 
             if instrumento is None:
                 raise PalmSensConnectionError("El SDK no retornó objeto instrumento (conexión fallida).")
 
             # Verificar estado del dispositivo
-            if asyncio.run(check_device_health(instrumento)):
-                log.info(f"✓ Conexión establecida correctamente (intento {attempt + 1}/{max_retries})")
+            if await asyncio.wait_for(check_device_health(instrumento), timeout_ms / 1000):
+                log.info("✓ Conexión establecida correctamente (intento %d/%d)", attempt + 1, max_retries)
                 
                 # Registrar conexión en el gestor
                 device_id = objetivo.get('serial') or objetivo.get('address')
@@ -355,9 +559,12 @@ def conectar_instrumento(serial: str = None,
 
         except Exception as e:
             last_exception = e
-            log.warning(f"Intento {attempt + 1}/{max_retries} fallido: {str(e)}")
+            log.warning("Intento %d/%d fallido: %s", attempt + 1, max_retries, e)
+            if isinstance(e, PalmSensConnectionError):
+                # El dispositivo pudo desaparecer: el siguiente escaneo no debe usar la caché
+                _invalidar_cache_descubrimiento()
             if attempt < max_retries - 1:
-                time.sleep(retry_delay)
+                await asyncio.sleep(_backoff_full_jitter(attempt, base=retry_delay, cap=backoff_cap))
             continue
 
     log.exception("✗ Error durante la conexión al instrumento")
@@ -382,7 +589,7 @@ def estado_instrumento(instrumento) -> dict:
     except Exception as e:
         est['connected'] = False
         est['last_error'] = str(e)
-    log.debug(f"Estado instrumento: {est}")
+    log.debug("Estado instrumento: %s", est)
     return est
 
 def desconectar_instrumento(instrumento):
@@ -393,10 +600,11 @@ def desconectar_instrumento(instrumento):
         if hasattr(instrumento, "Disconnect"):
             instrumento.Disconnect()
         else:
-            import pspymethods
-            if hasattr(pspymethods, "disconnect"):
-                pspymethods.disconnect(instrumento)
+            if hasattr(_pspymethods, "disconnect"):
+                _pspymethods.disconnect(instrumento)
         
+        _invalidar_cache_descubrimiento()
+
         # Limpiar del gestor de conexiones
         device_id = getattr(instrumento, 'SerialNumber', None)
         if device_id:
@@ -419,35 +627,95 @@ def desconectar_instrumento(instrumento):
 import datetime
 from typing import Dict, List, Optional
 import asyncio
-from collections import deque
+import numpy as np
+
+CV_BUFFER_SIZE = 10000  # últimas muestras conservadas durante el streaming
+HEARTBEAT_MIN_INTERVAL = 0.1  # s entre heartbeats durante el streaming (agrupa muestras)
+CV_BATCH_SIZE = 100           # muestras máximas por evento 'cv_data_batch'
+CV_BATCH_INTERVAL = 0.02      # s máximos que una muestra espera en el lote
 
-async def iniciar_medicion_cv_remota(instrumento, method_params: dict) -> dict:
+class _LoteCV:
+    """
+    Acumula muestras del streaming y las emite como un único evento 'cv_data_batch'
+    cada CV_BATCH_SIZE muestras o CV_BATCH_INTERVAL segundos (lo que ocurra antes).
+    """
+    __slots__ = ('device_id', 'loop', 'pots', 'curs', 't_ns', 't_ini', 't0')
+
+    def __init__(self, device_id: str, loop):
+        self.device_id = device_id
+        self.loop = loop
+        self.t0 = None  # instante de pared al que se refieren los offsets t_ns
+        self.pots, self.curs, self.t_ns = [], [], []
+        self.t_ini = 0.0
+
+    def agregar(self, potential: float, current: float, t_ns: int):
+        if not self.pots:
+            self.t_ini = self.loop.time()
+        self.pots.append(potential)
+        self.curs.append(current)
+        self.t_ns.append(t_ns)
+        if len(self.pots) >= CV_BATCH_SIZE or self.loop.time() - self.t_ini >= CV_BATCH_INTERVAL:
+            self.emitir()
+
+    def emitir(self):
+        """Emite las muestras pendientes (si las hay) y reinicia el lote."""
+        if not self.pots:
+            return
+        event_manager.emit_nowait('cv_data_batch', {
+            'potentials': self.pots,
+            'currents': self.curs,
+            't_ns': self.t_ns,
+            't0': self.t0
+        }, self.device_id)
+        self.pots, self.curs, self.t_ns = [], [], []
+
+def _desenrollar_anillo(buf: np.ndarray, n: int) -> np.ndarray:
+    """Devuelve las muestras del anillo en orden cronológico (n = total escritas)."""
+    if n <= len(buf):
+        return buf[:n]
+    i = n % len(buf)
+    return np.concatenate((buf[i:], buf[:i]))
+
+def _marcas_tiempo(t0: datetime.datetime, offsets_ns) -> np.ndarray:
+    """Reconstruye las marcas de pared (datetime64[ns]) de t0 + offsets en ns, vectorizado."""
+    return np.datetime64(t0, 'ns') + np.asarray(offsets_ns, dtype=np.int64).astype('timedelta64[ns]')
+
+async def iniciar_medicion_cv_remota(instrumento, method_params: dict, fine_grained: bool = False) -> dict:
     """
     Ejecuta una medición CV con eventos y streaming en tiempo real.
     
     Args:
         instrumento: Objeto instrumento PalmSens
         method_params: Parámetros de configuración CV
+        fine_grained: emitir un 'cv_data_point' por muestra en lugar de lotes 'cv_data_batch'
         
     Returns:
         dict: Datos normalizados y metadata de la sesión
     """
-    # Buffer circular para datos en tiempo real
-    buffer_datos = deque(maxlen=10000)
+    # Buffers circulares columnares (SoA) para datos en tiempo real
+    pot_buf = np.empty(CV_BUFFER_SIZE, dtype=np.float64)
+    cur_buf = np.empty(CV_BUFFER_SIZE, dtype=np.float64)
+    # Tiempos como offsets enteros (ns) respecto a t0: un solo datetime por medición
+    t_buf = np.empty(CV_BUFFER_SIZE, dtype=np.int64)
+    n_puntos = 0
     device_id = getattr(instrumento, 'SerialNumber', "Unknown")
+    loop = asyncio.get_running_loop()
+    last_hb = float('-inf')
+    lote = _LoteCV(device_id, loop)
 
     try:
-        import pspymethods
+        if _pspymethods is None:
+            raise PalmSensConnectionError("SDK pspymethods no disponible")
 
         # 1) Validar y normalizar parámetros
         method_params = _validar_parametros_cv(method_params)
         
         # 2) Configurar método CV con eventos
-        if hasattr(pspymethods, "configure_cv"):
+        if hasattr(_pspymethods, "configure_cv"):
             # Emitir evento de inicio de configuración (no bloquear)
             event_manager.emit_nowait('cv_config_start', method_params, device_id)
             
-            pspymethods.configure_cv(instrumento, **method_params)
+            _pspymethods.configure_cv(instrumento, **method_params)
             log.info("✓ Método CV configurado con parámetros: %s", method_params)
             
             event_manager.emit_nowait('cv_config_complete', {"status": "configured"}, device_id)
@@ -457,40 +725,56 @@ async def iniciar_medicion_cv_remota(instrumento, method_params: dict) -> dict:
         # 3) Configurar callback para streaming
         async def data_callback(punto_medicion):
             """Callback para procesar datos en tiempo real"""
+            nonlocal n_puntos, last_hb
             try:
-                datos = {
-                    "potential": float(punto_medicion.Potential),
-                    "current": float(punto_medicion.Current),
-                    "timestamp": datetime.datetime.now()
-                }
+                potential = float(punto_medicion.Potential)
+                current = float(punto_medicion.Current)
+                t_ns = time.perf_counter_ns() - t0_mono  # offset desde 't0' de cv_measurement_start
                 
-                # Almacenar en buffer
-                buffer_datos.append(datos)
+                # Almacenar en el anillo
+                i = n_puntos % CV_BUFFER_SIZE
+                pot_buf[i] = potential
+                cur_buf[i] = current
+                t_buf[i] = t_ns
+                n_puntos += 1
                 
-                # Emitir evento de datos
-                # Emitir sin bloquear el SDK
-                event_manager.emit_nowait('cv_data_point', datos, device_id)
+                # Emitir sin bloquear el SDK: por lotes salvo que se pida granularidad por punto
+                if fine_grained:
+                    event_manager.emit_nowait('cv_data_point',
+                                              {"potential": potential, "current": current,
+                                               "t_ns": t_ns, "t0": t0_wall},
+                                              device_id)
+                else:
+                    lote.agregar(potential, current, t_ns)
                 
-                # Registrar actividad del dispositivo
-                await event_manager.register_heartbeat(device_id)
+                # Registrar actividad del dispositivo (a lo sumo uno cada HEARTBEAT_MIN_INTERVAL)
+                now = loop.time()
+                if now - last_hb >= HEARTBEAT_MIN_INTERVAL:
+                    last_hb = now
+                    await event_manager.register_heartbeat(device_id)
                 
             except Exception as e:
                 event_manager.emit_nowait('cv_data_error', {"error": str(e)}, device_id)
 
         # 4) Ejecutar medición con streaming
-        if not hasattr(pspymethods, "run_cv_streaming"):
+        if not hasattr(_pspymethods, "run_cv_streaming"):
             raise PalmSensConnectionError("SDK no soporta streaming")
             
-        event_manager.emit_nowait('cv_measurement_start', {"mode": "streaming"}, device_id)
+        t0_wall = datetime.datetime.now()
+        t0_mono = time.perf_counter_ns()
+        lote.t0 = t0_wall
+        event_manager.emit_nowait('cv_measurement_start', {"mode": "streaming", "t0": t0_wall}, device_id)
         
-        data = await pspymethods.run_cv_streaming(
+        data = await _pspymethods.run_cv_streaming(
             instrumento,
             callback=data_callback,
             buffer_size=method_params.get("buffer_size", 1000)
         )
+        lote.emitir()  # muestras pendientes del último lote
 
     # 5) Normalizar y procesar curvas
-        curvas_normalizadas = _normalizar_curvas(list(buffer_datos))
+        pots, curs = _desenrollar_anillo(pot_buf, n_puntos), _desenrollar_anillo(cur_buf, n_puntos)
+        curvas_normalizadas = _segmentar_ciclos(pots, curs)
 
         # 6) Construir respuesta
         session_info = {
@@ -499,21 +783,14 @@ async def iniciar_medicion_cv_remota(instrumento, method_params: dict) -> dict:
             "end_potential": method_params.get("end_potential"),
             "software_version": "PSTrace 5.9.3803",
             "streaming_enabled": True,
-            "buffer_size": len(buffer_datos)
+            "buffer_size": len(pots)
         }
 
         # Preparar datos PCA tomando el tercer ciclo (si existe)
         datos_pca = None
-        if len(curvas_normalizadas) >= 3:
-            try:
-                datos_pca = [float(pt['current']) for pt in curvas_normalizadas[2]]
-            except Exception:
-                datos_pca = None
-        elif len(curvas_normalizadas) > 0:
-            try:
-                datos_pca = [float(pt['current']) for pt in curvas_normalizadas[0]]
-            except Exception:
-                datos_pca = None
+        if curvas_normalizadas:
+            ciclo = curvas_normalizadas[2] if len(curvas_normalizadas) >= 3 else curvas_normalizadas[0]
+            datos_pca = ciclo['currents'].tolist()
 
         # Estimaciones PPM y clasificación
         estimaciones_ppm = {}
@@ -586,7 +863,11 @@ async def iniciar_medicion_cv_remota(instrumento, method_params: dict) -> dict:
             'contamination_level': float(nivel_contaminacion),
             'model_meta': model_meta,
             'ppm_modelo': ppm_predicho,
-            'pca_points_count': len(datos_pca) if datos_pca else 0
+            'pca_points_count': len(datos_pca) if datos_pca else 0,
+            # Marcas de tiempo de las muestras: stream_t0 + offsets; se reconstruyen con
+            # _marcas_tiempo al serializar (JSON IoT, columna points.sample_time)
+            'stream_t0': t0_wall,
+            'sample_offsets_ns': _desenrollar_anillo(t_buf, n_puntos)
         }
 
         # Emitir evento de finalización con metadatos enriquecidos
@@ -604,16 +885,24 @@ async def iniciar_medicion_cv_remota(instrumento, method_params: dict) -> dict:
         raise PalmSensConnectionError(f"Error en medición CV: {str(e)}")
 
 
-def simulate_stream_from_pssession(metodo_load, ruta_archivo, rate_hz: float = 10.0, device_id: str = "SIM_PSTRACE", max_points: int = None):
+async def simulate_stream_from_pssession(metodo_load, ruta_archivo, rate_hz: float = 10.0, device_id: str = "SIM_PSTRACE", max_points: int = None,
+                                        fine_grained: bool = False):
     """
-    Simula un streaming a partir de un archivo .pssession emitiendo eventos 'cv_data_point'.
+    Simula un streaming a partir de un archivo .pssession emitiendo eventos 'cv_data_batch'
+    (o un 'cv_data_point' por muestra si fine_grained).
+    Corre en el bucle de eventos: la cadencia se agenda sobre loop.time() con
+    asyncio.sleep, sin la resolución de ~15 ms de time.sleep en Windows.
 
     Args:
         metodo_load: método LoadSessionFile configurado (de pstrace_session)
         ruta_archivo: ruta al archivo .pssession
         rate_hz: frecuencia de emisión en Hz
         device_id: identificador del dispositivo simulado
+        max_points: límite opcional de puntos emitidos
+        fine_grained: emitir eventos por punto en lugar de lotes
     """
+    loop = asyncio.get_running_loop()
+    lote = _LoteCV(device_id, loop)
     try:
         # Si no se pasó metodo_load intentar construirlo automáticamente
         if metodo_load is None:
@@ -627,7 +916,8 @@ def simulate_stream_from_pssession(metodo_load, ruta_archivo, rate_hz: float = 1
         # Procesar la sesión usando las funciones maestras de pstrace_session
         try:
             limites = cargar_limites_ppm()
-            resultado = extraer_y_procesar_sesion_completa(ruta_archivo, limites)
+            # Procesamiento pesado fuera del bucle de eventos
+            resultado = await asyncio.to_thread(extraer_y_procesar_sesion_completa, ruta_archivo, limites)
         except Exception as e:
             log.exception("Fallo procesando sesión para simulación: %s", e)
             resultado = None
@@ -643,13 +933,19 @@ def simulate_stream_from_pssession(metodo_load, ruta_archivo, rate_hz: float = 1
 
         # Usar la primera medición procesada
         first = measurements[0]
+        # Base temporal: timestamp de la medición si existe; los puntos llevan offsets en ns
+        base_ts = first.get('timestamp')
+        if not isinstance(base_ts, datetime.datetime):
+            base_ts = datetime.datetime.now()
+        lote.t0 = base_ts
         # Emitir configuración/metadata previa a la simulación
         try:
             event_manager.emit_nowait('cv_config', {
                 'title': first.get('title'),
                 'device_serial': first.get('device_serial'),
                 'curve_count': first.get('curve_count'),
-                'session_info': resultado.get('session_info')
+                'session_info': resultado.get('session_info'),
+                't0': base_ts
             }, device_id)
         except Exception:
             log.debug("No se pudo emitir cv_config")
@@ -657,67 +953,56 @@ def simulate_stream_from_pssession(metodo_load, ruta_archivo, rate_hz: float = 1
         # 'curves' en la estructura resultante contiene listas de puntos dicts
         curves = first.get('curves') or []
 
-        # Construir lista de puntos iterables
-        points = []
+        # Convertir cada curva a ndarray una sola vez; los dicts de punto se construyen
+        # al emitir. Cada curva se recorta a su propio mínimo para no desalinear pares
+        pares = []
         for curva in curves:
-            # curva es {'potentials': [...], 'currents': [...]}
-            pots = curva.get('potentials') or []
-            curs = curva.get('currents') or []
-            for i in range(min(len(pots), len(curs))):
-                points.append({
-                    'potential': float(pots[i]),
-                    'current': float(curs[i]),
-                    'timestamp': datetime.datetime.now()
-                })
-
-        if not points:
+            # curva es {'potentials': ndarray, 'currents': ndarray}
+            pots = curva.get('potentials')
+            curs = curva.get('currents')
+            if pots is None or curs is None:
+                continue
+            pots = np.asarray(pots, dtype=np.float64)
+            curs = np.asarray(curs, dtype=np.float64)
+            m = min(len(pots), len(curs))
+            pares.append((pots[:m], curs[:m]))
+
+        n_puntos = sum(len(p) for p, _ in pares)
+        if not n_puntos:
             log.error("No se encontraron puntos en la sesión para simular")
             return
 
+        # tolist() produce floats nativos en un solo bucle C (sin float() por elemento)
+        pots_py = np.concatenate([p for p, _ in pares]).tolist()
+        curs_py = np.concatenate([c for _, c in pares]).tolist()
+
         interval = 1.0 / max(0.1, rate_hz)
-        log.info("Iniciando simulación de streaming desde %s a %.2f Hz (%d puntos)", ruta_archivo, rate_hz, len(points))
-        import time
+        log.info("Iniciando simulación de streaming desde %s a %.2f Hz (%d puntos)", ruta_archivo, rate_hz, n_puntos)
+        interval_ns = round(interval * 1e9)
+        t0 = loop.time()
+        last_hb = float('-inf')
         sent = 0
-        for pt in points:
+        for potential, current in zip(pots_py, curs_py):
             if max_points is not None and sent >= max_points:
                 break
 
-            # ajustar timestamp: si measurement tiene timestamp usarlo como base
-            try:
-                base_ts = first.get('timestamp')
-                if base_ts and isinstance(base_ts, datetime.datetime):
-                    # incrementar microsegundos según índice y rate
-                    delta_seconds = sent * interval
-                    pt_ts = base_ts + datetime.timedelta(seconds=delta_seconds)
-                    pt['timestamp'] = pt_ts
-                else:
-                    pt['timestamp'] = datetime.datetime.now()
-            except Exception:
-                pt['timestamp'] = datetime.datetime.now()
-
-            event_manager.emit_nowait('cv_data_point', pt, device_id)
-
-            # registrar heartbeat en background de forma robusta
-            try:
-                loop = None
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        asyncio.run_coroutine_threadsafe(event_manager.register_heartbeat(device_id), loop)
-                    else:
-                        # crear loop temporal para registro
-                        asyncio.run(event_manager.register_heartbeat(device_id))
-                except RuntimeError:
-                    # no hay loop asociado al hilo actual
-                    try:
-                        asyncio.run(event_manager.register_heartbeat(device_id))
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+            # Esperar hasta el instante programado del punto (sin deriva acumulada)
+            await asyncio.sleep(max(0.0, t0 + sent * interval - loop.time()))
 
+            t_ns = sent * interval_ns  # offset desde 't0' de cv_config
+            if fine_grained:
+                event_manager.emit_nowait('cv_data_point',
+                                          {'potential': potential, 'current': current,
+                                           't_ns': t_ns, 't0': base_ts},
+                                          device_id)
+            else:
+                lote.agregar(potential, current, t_ns)
+            now = loop.time()
+            if now - last_hb >= HEARTBEAT_MIN_INTERVAL:
+                last_hb = now
+                await event_manager.register_heartbeat(device_id)
             sent += 1
-            time.sleep(interval)
+        lote.emitir()
 
         # Al finalizar, calcular estimaciones PPM para la simulación si es posible
         try:
@@ -729,13 +1014,13 @@ def simulate_stream_from_pssession(metodo_load, ruta_archivo, rate_hz: float = 1
                 datos_pca = curves[0].get('currents')
 
             ppm_result = None
-            if datos_pca:
+            if datos_pca is not None and len(datos_pca):
                 ppm_result = calcular_estimaciones_ppm(datos_pca, limites)
 
-            event_manager.emit_nowait('cv_measurement_complete', {'simulated': True, 'points': len(points), 'ppm': ppm_result}, device_id)
+            event_manager.emit_nowait('cv_measurement_complete', {'simulated': True, 'points': n_puntos, 'ppm': ppm_result}, device_id)
         except Exception as e:
             log.debug("Error calculando PPM en simulación: %s", e)
-            event_manager.emit_nowait('cv_measurement_complete', {'simulated': True, 'points': len(points)}, device_id)
+            event_manager.emit_nowait('cv_measurement_complete', {'simulated': True, 'points': n_puntos}, device_id)
 
     except Exception as e:
         log.exception("Error en simulate_stream_from_pssession: %s", e)
@@ -753,27 +1038,28 @@ def _validar_parametros_cv(params: Dict) -> Dict:
         
     return params
 
-def _normalizar_curvas(buffer_datos: List[Dict]) -> List[List[Dict]]:
-    """Convierte buffer de datos en curvas normalizadas"""
+MIN_PUNTOS_CICLO = 100  # un ciclo se cierra al bajar el potencial tras >100 puntos
+
+def _segmentar_ciclos(pots: np.ndarray, curs: np.ndarray) -> List[Dict]:
+    """
+    Divide las series en ciclos: el punto i cierra un ciclo (incluyéndose) si su
+    potencial baja respecto al anterior y el ciclo ya acumula más de
+    MIN_PUNTOS_CICLO puntos. Las bajadas se localizan con np.diff y cada cierre
+    se busca con searchsorted, sin recorrer punto a punto.
+    """
+    bajadas = np.flatnonzero(np.diff(pots) < 0) + 1
     curvas = []
-    curva_actual = []
-    
-    for punto in buffer_datos:
-        curva_actual.append({
-            "potential": punto["potential"],
-            "current": punto["current"]
+    inicio = 0
+    n = len(pots)
+    while inicio < n:
+        k = np.searchsorted(bajadas, inicio + MIN_PUNTOS_CICLO)
+        fin = int(bajadas[k]) + 1 if k < len(bajadas) else n
+        curvas.append({
+            "index": len(curvas),
+            "potentials": pots[inicio:fin],
+            "currents": curs[inicio:fin],
         })
-        
-        # Detectar fin de ciclo (cambio en dirección del potencial)
-        if len(curva_actual) > 1:
-            if (curva_actual[-1]["potential"] < curva_actual[-2]["potential"] and
-                len(curva_actual) > 100):  # mínimo de puntos
-                curvas.append(curva_actual)
-                curva_actual = []
-                
-    if curva_actual:  # agregar última curva
-        curvas.append(curva_actual)
-        
+        inicio = fin
     return curvas
 
 
@@ -784,6 +1070,35 @@ def _normalizar_curvas(buffer_datos: List[Dict]) -> List[List[Dict]]:
 from src.db_connection import conectar_bd as get_connection
 from src.insert_data import guardar_sesion, guardar_mediciones
 # Nota: ajusta los imports según tu estructura real de proyecto
+import queue
+
+# Pool de conexiones BD reutilizadas entre sesiones remotas encadenadas
+# (evita el handshake TCP+TLS+auth en cada sesión)
+DB_POOL_SIZE = 4
+_DB_POOL = queue.Queue(maxsize=DB_POOL_SIZE)
+
+def _obtener_conexion_bd():
+    """Toma una conexión libre del pool o abre una nueva si no hay ninguna."""
+    try:
+        return _DB_POOL.get_nowait()
+    except queue.Empty:
+        return get_connection()
+
+def _liberar_conexion_bd(conn):
+    """
+    Devuelve la conexión al pool cerrando su transacción; si está rota o
+    el pool está lleno, se cierra.
+    """
+    try:
+        conn.rollback()
+        _DB_POOL.put_nowait(conn)
+        return
+    except Exception:
+        pass
+    try:
+        conn.close()
+    except Exception:
+        pass
 
 def ejecutar_sesion_remota(serial: str, method_params: dict, gui_refresh_callback=None):
     """
@@ -805,10 +1120,10 @@ def ejecutar_sesion_remota(serial: str, method_params: dict, gui_refresh_callbac
         instrumento = conectar_instrumento(serial=serial)
 
         # 2) Medición remota
-        datos = iniciar_medicion_cv_remota(instrumento, method_params)
+        datos = _ejecutar_en_bucle(iniciar_medicion_cv_remota(instrumento, method_params))
 
         # 3) Conexión a BD
-        conn = get_connection()
+        conn = _obtener_conexion_bd()
 
         # 4) Guardar sesión y mediciones
         session_id = guardar_sesion(
@@ -834,35 +1149,59 @@ def ejecutar_sesion_remota(serial: str, method_params: dict, gui_refresh_callbac
         if instrumento:
             desconectar_instrumento(instrumento)
         if conn:
-            conn.close()
+            _liberar_conexion_bd(conn)
 
 # ===================================================================================
 # BLOQUE 6: ROBUSTEZ Y RESILIENCIA
 # ===================================================================================
 
-import time
-import random
+HOTPLUG_POLL_INTERVAL = 1.0  # s entre escaneos durante la espera de conectar_con_reintentos
 
 def conectar_con_reintentos(serial: str = None,
                             address: str = None,
                             intentos: int = 3,
-                            base_delay: float = 1.0):
+                            base_delay: float = 1.0,
+                            cap: float = 30.0):
     """
     Intenta conectar al instrumento con reintentos y backoff exponencial.
+    Durante la espera entre intentos se escanea cada HOTPLUG_POLL_INTERVAL
+    segundos: si aparece el equipo buscado (o cualquiera, sin serial/address)
+    o un escaneo concurrente emite 'device_added', se reintenta de inmediato.
     """
+    objetivo = serial or address
+    forzar = True  # el primer intento (o tras un 'device_added' ajeno) escanea de nuevo
     for intento in range(1, intentos + 1):
         try:
-            instr = conectar_instrumento(serial=serial, address=address)
+            instr = conectar_instrumento(serial=serial, address=address,
+                                         force_discovery=forzar)
             est = estado_instrumento(instr)
             if est['connected']:
-                log.info(f"✓ Conexión establecida en intento {intento}")
+                log.info("✓ Conexión establecida en intento %d", intento)
                 return instr
         except Exception as e:
-            log.warning(f"⚠ Fallo intento {intento}: {e}")
-        # Espera exponencial con jitter
-        delay = base_delay * (2 ** (intento - 1)) + random.uniform(0, 0.5)
-        log.info(f"Reintentando en {delay:.1f} segundos...")
-        time.sleep(delay)
+            log.warning("⚠ Fallo intento %d: %s", intento, e)
+        forzar = False
+        if intento == intentos:
+            break
+        # Espera exponencial con full jitter (evita reconexiones sincronizadas), interrumpible por hotplug
+        delay = _backoff_full_jitter(intento - 1, base=base_delay, cap=cap)
+        log.info("Reintentando en %.1f segundos...", delay)
+        fin = time.monotonic() + delay
+        while time.monotonic() < fin:
+            restante = fin - time.monotonic()
+            if event_manager.wait('device_added', timeout=max(0.0, min(HOTPLUG_POLL_INTERVAL, restante))):
+                log.info("Dispositivo detectado; reintentando de inmediato")
+                forzar = True
+                break
+            try:
+                # Misma clave de caché que conectar_instrumento: el reintento reutiliza este escaneo
+                dispositivos = descubrir_instrumentos(early_exit_serial=objetivo, force=True)
+            except Exception as e:
+                log.debug("Escaneo durante la espera fallido: %s", e)
+                continue
+            if any(objetivo is None or objetivo in (d['serial'], d['address']) for d in dispositivos):
+                log.info("Dispositivo detectado; reintentando de inmediato")
+                break
     raise PalmSensConnectionError("No se pudo conectar tras múltiples intentos.")
 
 
@@ -872,6 +1211,9 @@ def ejecutar_sesion_remota_segura(serial: str, method_params: dict, gui_refresh_
     - Conexión robusta (reintentos)
     - Validación de estado antes de medir
     - Manejo seguro de errores
+
+    Returns:
+        tuple: (session_id, datos) para que el llamador reutilice la medición
     """
     conn = None
     instrumento = None
@@ -885,10 +1227,10 @@ def ejecutar_sesion_remota_segura(serial: str, method_params: dict, gui_refresh_
             raise PalmSensConnectionError("Instrumento no está en estado conectado.")
 
         # 3) Medición remota
-        datos = iniciar_medicion_cv_remota(instrumento, method_params)
+        datos = _ejecutar_en_bucle(iniciar_medicion_cv_remota(instrumento, method_params))
 
         # 4) Guardar en BD
-        conn = get_connection()
+        conn = _obtener_conexion_bd()
         session_id = guardar_sesion(conn,
                                     filename=f"REMOTE_{serial}",
                                     info=datos['session_info'])
@@ -900,7 +1242,7 @@ def ejecutar_sesion_remota_segura(serial: str, method_params: dict, gui_refresh_
             gui_refresh_callback()
             log.info("✓ GUI refrescada tras inserción de sesión remota")
 
-        return session_id
+        return session_id, datos
 
     except Exception:
         log.exception("✗ Error en sesión remota segura")
@@ -912,7 +1254,7 @@ def ejecutar_sesion_remota_segura(serial: str, method_params: dict, gui_refresh_
             except Exception:
                 log.warning("⚠ Fallo al desconectar instrumento")
         if conn:
-            conn.close()
+            _liberar_conexion_bd(conn)
 
 # ===================================================================================
 # BLOQUE 7: INTEGRACIÓN CON GUI
@@ -937,9 +1279,9 @@ def ejecutar_sesion_remota_gui(serial: str,
         if on_connect:
             on_connect(estado_instrumento(instrumento))
 
-        datos = iniciar_medicion_cv_remota(instrumento, method_params)
+        datos = _ejecutar_en_bucle(iniciar_medicion_cv_remota(instrumento, method_params))
 
-        conn = get_connection()
+        conn = _obtener_conexion_bd()
         session_id = guardar_sesion(conn,
                                     filename=f"REMOTE_{serial}",
                                     info=datos['session_info'])
@@ -963,4 +1305,266 @@ def ejecutar_sesion_remota_gui(serial: str,
             except Exception:
                 log.warning("⚠ Fallo al desconectar instrumento")
         if conn:
-            conn.close()            
+            _liberar_conexion_bd(conn)            
+
+# ===================================================================================
+# BLOQUE 8: TRANSFERENCIA DE ARCHIVOS AL SERVIDOR IoT
+# ===================================================================================
+
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+IOT_PORT = 5000
+IOT_SNDBUF = 1 << 20
+IOT_GZIP_LEVEL = 3  # equilibrio CPU/ratio para dispositivos modestos
+IOT_MAX_PENDING = 8  # envíos en vuelo antes de frenar al productor
+
+# Los envíos IoT corren en segundo plano para no retener instrumento ni BD
+_IOT_EXEC = ThreadPoolExecutor(max_workers=2, thread_name_prefix="iot-send")
+_IOT_SLOTS = threading.BoundedSemaphore(IOT_MAX_PENDING)
+
+
+def _sha256_archivo(filepath: str) -> str:
+    """
+    Calcula el SHA-256 en flujo con hashlib.file_digest (OpenSSL, sin copiar el
+    archivo completo a memoria); en Python < 3.11 recurre a bloques de 1 MiB.
+    """
+    with open(filepath, 'rb') as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for b in iter(lambda: f.read(1 << 20), b''):
+            h.update(b)
+        return h.hexdigest()
+
+
+def _recv_exacto(s: socket.socket, n: int) -> bytes:
+    """Lee exactamente n bytes (o menos si el servidor cierra); tolera lecturas parciales."""
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = s.recv(n - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+
+# Conexiones persistentes al servidor IoT, una libre por (host, port). Un socket
+# se retira del pool mientras se usa, así dos envíos nunca lo comparten.
+_IOT_POOL: Dict[tuple, socket.socket] = {}
+_IOT_POOL_LOCK = threading.Lock()
+
+
+def _socket_vivo(s: socket.socket) -> bool:
+    """Un socket inactivo legible solo puede traer un cierre del servidor (recv vacío)."""
+    try:
+        readable, _, _ = select.select([s], [], [], 0)
+        return not readable or bool(s.recv(1, socket.MSG_PEEK))
+    except OSError:
+        return False
+
+
+def _tomar_socket_iot(host: str, port: int, timeout: float):
+    """Retorna (socket, reutilizado): una conexión libre del pool o una nueva."""
+    with _IOT_POOL_LOCK:
+        s = _IOT_POOL.pop((host, port), None)
+    if s is not None:
+        if _socket_vivo(s):
+            return s, True
+        s.close()
+    s = socket.create_connection((host, port), timeout=timeout)
+    # Búfer de envío amplio: el kernel agrupa más datos por segmento
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, IOT_SNDBUF)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    return s, False
+
+
+def _devolver_socket_iot(host: str, port: int, s: socket.socket):
+    """Devuelve la conexión al pool; si ya hay una libre para ese destino, la cierra."""
+    with _IOT_POOL_LOCK:
+        if (host, port) not in _IOT_POOL:
+            _IOT_POOL[(host, port)] = s
+            return
+    s.close()
+
+
+def _transferir_archivo_iot(s: socket.socket, filepath: str, header: dict) -> bytes:
+    """Envía una trama (encabezado + `size` bytes) y retorna la respuesta final."""
+    s.sendall(json.dumps(header).encode() + b"\n")
+    ack = _recv_exacto(s, 3)
+    if ack != b"ACK":
+        raise PalmSensConnectionError(f"Servidor IoT no aceptó la transferencia (ack={ack!r})")
+
+    # sendfile(2): página de caché -> socket sin pasar por espacio de usuario
+    # (socket.sendfile recurre a send() en plataformas sin soporte)
+    with open(filepath, 'rb') as f:
+        s.sendfile(f)
+    if not header.get("keep_alive"):
+        # Sin conexión persistente se mantiene el marcador EOF por compatibilidad
+        s.sendall(b"EOF")
+    return _recv_exacto(s, len(b"EOF_OK"))
+
+
+def enviar_archivo_iot(filepath: str,
+                       host: str,
+                       port: int = IOT_PORT,
+                       serial: str = None,
+                       timeout: float = 10.0,
+                       keep_alive: bool = True) -> bool:
+    """
+    Envía un archivo al servidor IoT de la interfaz gráfica.
+
+    Protocolo: encabezado JSON terminado en '\\n' (filename, size, checksum, serial,
+    encoding='gzip' para archivos .gz, keep_alive), espera 'ACK', envía exactamente
+    `size` bytes y lee la confirmación final. Con keep_alive la conexión queda en
+    un pool para el siguiente archivo al mismo destino; sin él se añade 'EOF'.
+
+    Args:
+        filepath (str): Ruta del archivo a enviar
+        host (str): Dirección del servidor IoT
+        port (int): Puerto TCP del servidor
+        serial (str, optional): Serial del dispositivo de origen
+        timeout (float): Timeout de socket en segundos
+        keep_alive (bool): Reutiliza conexiones persistentes al servidor
+
+    Returns:
+        bool: True si el servidor confirmó el checksum (EOF_OK)
+    """
+    size = os.path.getsize(filepath)
+    header = {
+        "action": "send_file",
+        "filename": os.path.basename(filepath),
+        "size": size,
+        "checksum": _sha256_archivo(filepath),
+        "keep_alive": keep_alive,
+    }
+    if serial:
+        header["serial"] = serial
+    if filepath.endswith(".gz"):
+        # El servidor verifica el checksum sobre lo recibido y luego descomprime
+        header["encoding"] = "gzip"
+
+    while True:
+        s = None
+        reutilizado = False
+        try:
+            if keep_alive:
+                s, reutilizado = _tomar_socket_iot(host, port, timeout)
+            else:
+                s = socket.create_connection((host, port), timeout=timeout)
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, IOT_SNDBUF)
+            resp = _transferir_archivo_iot(s, filepath, header)
+        except (OSError, PalmSensConnectionError):
+            if s is not None:
+                s.close()
+            if reutilizado:
+                # Conexión del pool caducada: un único reintento con una nueva
+                log.debug("Conexión IoT persistente caducada; reconectando a %s:%s", host, port)
+                continue
+            log.exception("✗ Error enviando archivo al servidor IoT")
+            return False
+
+        if resp != b"EOF_OK":
+            s.close()
+            log.warning("⚠ Servidor IoT rechazó %s: %r", header['filename'], resp)
+            return False
+        if keep_alive:
+            _devolver_socket_iot(host, port, s)
+        else:
+            s.close()
+        log.info("✓ Archivo %s enviado a %s:%s (%d bytes)", header['filename'], host, port, size)
+        return True
+
+
+def _json_default(obj):
+    """Serializa arrays de curvas (SoA) como listas y el resto como texto."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+def _con_marcas_tiempo(m: dict) -> dict:
+    """Añade 'sample_timestamps' (ISO, µs) a una medición en streaming; el resto pasa tal cual."""
+    t0, offsets = m.get('stream_t0'), m.get('sample_offsets_ns')
+    if t0 is None or offsets is None:
+        return m
+    marcas = np.datetime_as_string(_marcas_tiempo(t0, offsets), unit='us')
+    return {**m, 'sample_timestamps': marcas.tolist()}
+
+
+def generar_archivo_json_iot(datos: dict, serial: str, out_dir: str = None,
+                             compress: bool = True) -> str:
+    """
+    Serializa los datos de una sesión remota en un archivo JSON para envío IoT.
+    Con `compress` se escribe comprimido (.json.gz, gzip nivel IOT_GZIP_LEVEL):
+    los datos CV son texto numérico y se reducen varias veces.
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    out_dir = out_dir or os.path.join(project_root, "archivos_iot")
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(out_dir, f"IOT_{serial}_{stamp}.json")
+    # Copia superficial: las marcas de pared se añaden sin tocar el dict del llamador
+    datos = {**datos, 'measurements': [_con_marcas_tiempo(m) for m in datos.get('measurements') or []]}
+    # Salida compacta: el archivo es para máquinas y va comprimido
+    if orjson is not None:
+        # orjson serializa datetime y ndarray en C; default solo se invoca para tipos raros
+        payload = orjson.dumps(datos, default=_json_default,
+                               option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        # Sin indent el módulo json usa su codificador en C
+        payload = json.dumps(datos, default=_json_default, ensure_ascii=False,
+                             separators=(',', ':')).encode('utf-8')
+    if compress:
+        filepath += ".gz"
+        with gzip.open(filepath, 'wb', compresslevel=IOT_GZIP_LEVEL) as f:
+            f.write(payload)
+    else:
+        with open(filepath, 'wb') as f:
+            f.write(payload)
+    log.info(f"✓ Archivo IoT generado: {filepath}")
+    return filepath
+
+
+def _enviar_archivo_iot_async(filepath: str, host: str, port: int, serial: str = None):
+    """
+    Encola el envío en _IOT_EXEC. Si ya hay IOT_MAX_PENDING envíos en vuelo,
+    bloquea al llamador hasta que se libere uno (evita acumular archivos en memoria).
+    """
+    _IOT_SLOTS.acquire()
+    try:
+        future = _IOT_EXEC.submit(enviar_archivo_iot, filepath, host, port, serial=serial)
+    except Exception:
+        _IOT_SLOTS.release()
+        raise
+    future.add_done_callback(lambda _f: _IOT_SLOTS.release())
+    return future
+
+
+def ejecutar_sesion_remota_iot(serial: str,
+                               method_params: dict,
+                               gui_refresh_callback=None,
+                               host: str = None,
+                               port: int = IOT_PORT):
+    """
+    Ejecuta una sesión remota segura, genera su JSON y, si se indica host,
+    lo envía al servidor IoT en segundo plano. La medición se realiza una sola
+    vez: el JSON se construye con los mismos datos que se guardaron en BD.
+
+    Returns:
+        tuple: (session_id, ruta del JSON generado)
+    """
+    session_id, datos = ejecutar_sesion_remota_segura(serial, method_params, gui_refresh_callback)
+    filepath = generar_archivo_json_iot(datos, serial)
+    if host:
+        _enviar_archivo_iot_async(filepath, host, port, serial=serial)
+    return session_id, filepath
@@ -1500,6 +1500,9 @@ import sys
 import logging
 import json
 import datetime
+import hashlib
+import itertools
+import threading
 import traceback
 import csv
 import joblib
@@ -1507,6 +1510,16 @@ import numpy as np
 from pathlib import Path
 import logging
 log = logging.getLogger(__name__)
+
+try:
+    import numba  # kernels compilados opcionales para el preprocesamiento por muestra
+except ImportError:  # sin numba se usa la ruta NumPy equivalente
+    numba = None
+
+try:
+    import orjson  # parser en C que opera directamente sobre bytes
+except ImportError:  # orjson es opcional; se recurre a json
+    orjson = None
 from canonical import normalize_classification, display_label_from_label
 
 # ===================================================================================
@@ -1568,6 +1581,10 @@ log = configurar_logging_avanzado()
 # BLOQUE 3: GESTIÓN DE LÍMITES PPM Y CONFIGURACIÓN
 # ===================================================================================
 
+# Límites ya validados: ruta absoluta -> ((mtime_ns, tamaño), resultados). Una llamada
+# en caliente cuesta un stat() en lugar de leer, hashear y parsear el JSON
+_LIMITS_CACHE = {}
+
 def cargar_limites_ppm(ppm_file='limits_ppm.json'):
     """
     Carga los límites de concentración PPM desde archivo JSON
@@ -1594,32 +1611,42 @@ def cargar_limites_ppm(ppm_file='limits_ppm.json'):
                   razón en los logs. Otras capas del pipeline deben interpretar
                   None como "límite desconocido" y actuar según la política.
     """
-    import hashlib
-    from pathlib import Path
-
     # Claves oficiales esperadas
     claves_oficiales = ["Cd", "Zn", "Cu", "Cr", "Ni"]
     limites_por_defecto = {k: None for k in claves_oficiales}
 
     ppm_path = Path(ppm_file)
+    abs_path = str(ppm_path.resolve())
 
     # Metadatos de versión iniciales
-    limits_meta = {"sha256": None, "mtime": None, "path": str(ppm_path.resolve()), "load_error": None}
+    limits_meta = {"sha256": None, "mtime": None, "path": abs_path, "load_error": None}
 
     try:
-        if ppm_path.exists():
-            # Leer en bytes para calcular hash y luego decodificar para JSON
+        try:
+            st = ppm_path.stat()
+            firma = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            firma = None
+        cacheado = _LIMITS_CACHE.get(abs_path)
+        if firma is not None and cacheado is not None and cacheado[0] == firma:
+            return dict(cacheado[1])
+
+        if firma is not None:
+            # SHA256 del archivo (trazabilidad) con hashlib.file_digest sobre el mismo
+            # descriptor; luego se rebobina y se leen los bytes para el JSON. Solo corre
+            # cuando la firma (mtime, tamaño) cambió: las llamadas en caliente usan la caché
             with open(ppm_path, 'rb') as f:
+                try:
+                    if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                        limits_meta["sha256"] = hashlib.file_digest(f, 'sha256').hexdigest()
+                    else:
+                        limits_meta["sha256"] = hashlib.sha256(f.read()).hexdigest()
+                except Exception as e:
+                    limits_meta["sha256"] = None
+                    log.warning("⚠ No se pudo calcular sha256 de %s: %s", ppm_file, str(e))
+                f.seek(0)
                 raw = f.read()
 
-            # SHA256 del archivo (trazabilidad)
-            try:
-                sha256 = hashlib.sha256(raw).hexdigest()
-                limits_meta["sha256"] = sha256
-            except Exception as e:
-                limits_meta["sha256"] = None
-                log.warning("⚠ No se pudo calcular sha256 de %s: %s", ppm_file, str(e))
-
             # mtime
             try:
                 limits_meta["mtime"] = ppm_path.stat().st_mtime
@@ -1628,8 +1655,10 @@ def cargar_limites_ppm(ppm_file='limits_ppm.json'):
 
             # Decodificar y parsear JSON con defensiva
             try:
-                text = raw.decode('utf-8')
-                parsed = json.loads(text)
+                if orjson is not None:
+                    parsed = orjson.loads(raw)  # sin paso intermedio de decode a str
+                else:
+                    parsed = json.loads(raw.decode('utf-8'))
                 if not isinstance(parsed, dict):
                     raise ValueError("JSON no contiene un objeto/dict en raíz")
             except Exception as e:
@@ -1663,8 +1692,11 @@ def cargar_limites_ppm(ppm_file='limits_ppm.json'):
             # Añadir metadatos de versión
             resultados["_limits_version"] = limits_meta
 
+            # Solo se memoiza una carga válida; un cambio de mtime/tamaño invalida la entrada
+            _LIMITS_CACHE[abs_path] = (firma, resultados)
+
             log.info("✓ Límites PPM cargados desde %s (version=%s)", ppm_file, limits_meta.get("sha256"))
-            return resultados
+            return dict(resultados)
 
         else:
             # Archivo no existe: devolver defaults y marcar metadatos
@@ -1727,6 +1759,19 @@ def configurar_sdk_palmsens():
 # BLOQUE 5: CONFIGURACIÓN AVANZADA DEL MÉTODO LOADSESSIONFILE
 # ===================================================================================
 
+# Reflexión resuelta una sola vez: método configurado y su número de parámetros,
+# más el Boolean(False) ya convertido que se reutiliza en cada carga
+_METODO_LOAD = None
+_LOAD_NUM_PARAMS = None
+_BOX_FALSE = Boolean(False)
+
+def _registrar_metodo_load(metodo):
+    """Memoriza el método LoadSessionFile y su aridad para cargar_sesion_pssession."""
+    global _METODO_LOAD, _LOAD_NUM_PARAMS
+    _METODO_LOAD = metodo
+    _LOAD_NUM_PARAMS = metodo.GetParameters().Length
+    return metodo
+
 def cargar_y_configurar_metodo_load(dll_path):
     """
     Carga la DLL y configura dinámicamente el método LoadSessionFile
@@ -1749,25 +1794,19 @@ def cargar_y_configurar_metodo_load(dll_path):
             log.critical("✗ Clase LoadSaveHelperFunctions no encontrada")
             sys.exit(1)
         
-        # Método 1: Búsqueda por parámetros (pstrace_session original)
-        for metodo in tipo.GetMethods():
-            if metodo.Name == 'LoadSessionFile':
-                params = [p.ParameterType.Name for p in metodo.GetParameters()]
-                if params in [['String'], ['String', 'Boolean']]:
-                    log.info("✓ LoadSessionFile encontrado - Método 1 - Parámetros: %s", params)
-                    return metodo
-        
-        # Método 2: Búsqueda por tipos CLR (insert_data)
+        # Búsqueda directa por firma CLR (sin recorrer GetMethods()): primero la
+        # sobrecarga (String), luego (String, Boolean)
+        from System import Array, Type
         parametros_posibles = [
             [clr.GetClrType(str)],
             [clr.GetClrType(str), clr.GetClrType(bool)]
         ]
         
         for params in parametros_posibles:
-            metodo = tipo.GetMethod("LoadSessionFile", params)
+            metodo = tipo.GetMethod("LoadSessionFile", Array[Type](params))
             if metodo:
-                log.info("✓ LoadSessionFile encontrado - Método 2 - Tipos CLR: %s", params)
-                return metodo
+                log.info("✓ LoadSessionFile encontrado - Tipos CLR: %s", params)
+                return _registrar_metodo_load(metodo)
         
         raise AttributeError('LoadSessionFile no encontrado con ningún método')
         
@@ -1779,6 +1818,37 @@ def cargar_y_configurar_metodo_load(dll_path):
 # BLOQUE 6: PROCESAMIENTO AVANZADO DE CICLOS VOLTAMÉTRICOS
 # ===================================================================================
 
+# Búfer de trabajo de procesar_ciclos_voltametricos, uno por hilo (las sesiones
+# se cargan en paralelo vía asyncio.to_thread); solo crece
+_SCRATCH = threading.local()
+
+def _scratch(n):
+    """Búfer float64 del hilo actual con capacidad para al menos n valores."""
+    buf = getattr(_SCRATCH, 'buf', None)
+    if buf is None or n > buf.size:
+        buf = _SCRATCH.buf = np.empty(n, dtype=np.float64)
+    return buf
+
+def _net_a_ndarray(valores_net, destino=None):
+    """
+    Copia un double[] de .NET a un ndarray float64 con una sola llamada a
+    Marshal.Copy (memcpy), sin cruzar la frontera CLR→Python por elemento.
+    Si se pasa `destino` (float64 contiguo con capacidad suficiente) se copia
+    sobre él y se devuelve la vista destino[:n] en lugar de reservar memoria.
+    Si la copia directa no es posible se llena el búfer desde el iterador.
+    """
+    try:
+        from System import IntPtr
+        from System.Runtime.InteropServices import Marshal
+
+        n = valores_net.Length
+        buf = destino[:n] if destino is not None else np.empty(n, dtype=np.float64)
+        if n:
+            Marshal.Copy(valores_net, 0, IntPtr(buf.ctypes.data), n)
+        return buf
+    except Exception:
+        return np.fromiter(valores_net, dtype=np.float64)
+
 def procesar_ciclos_voltametricos(curves):
     """
     Procesamiento avanzado de ciclos voltamétricos según especificaciones.
@@ -1789,47 +1859,50 @@ def procesar_ciclos_voltametricos(curves):
         curves: Array de curvas voltamétricas
 
     Returns:
-        list: Datos del tercer ciclo (corrientes en float) o lista vacía si falla
+        np.ndarray: Corrientes del tercer ciclo (float64) o array vacío si falla
+
+    Nota:
+        El resultado es una vista sobre el búfer de trabajo del hilo actual
+        (_SCRATCH) y se sobrescribe en la siguiente llamada desde el mismo hilo;
+        quien necesite conservarlo más allá del procesamiento de la medición
+        actual debe copiarlo (.copy()). Llamadas desde hilos distintos no se pisan.
     """
     try:
-        # Importaciones locales por seguridad (no dependen del scope global)
-        import traceback
-
-        # Convertir a lista para manejo uniforme
-        arr_curves = list(curves)
-        total_ciclos = len(arr_curves)
+        # Acceso indexado directo: solo se materializa una lista si `curves` es
+        # un enumerable sin longitud ni índice (evita marshalling de todos los ciclos)
+        if hasattr(curves, 'Count'):
+            total_ciclos = curves.Count
+        elif hasattr(curves, '__len__') and hasattr(curves, '__getitem__'):
+            total_ciclos = len(curves)
+        else:
+            curves = list(curves)
+            total_ciclos = len(curves)
 
         log.info("📊 Procesando %d ciclos voltamétricos", total_ciclos)
 
         # Validar cantidad mínima de ciclos
         if total_ciclos < 3:
             log.warning("⚠ Cantidad insuficiente de ciclos: %d (mínimo: 3)", total_ciclos)
-            return []
+            return np.empty(0)
 
         # Seleccionar únicamente el tercer ciclo (índice 2)
-        tercer_ciclo = arr_curves[2]
+        tercer_ciclo = curves[2]
         log.info("✓ Ciclo seleccionado para análisis: 3")
 
         # Extraer valores Y (corrientes) del tercer ciclo
-        try:
-            corrientes = [float(y) for y in tercer_ciclo.GetYValues()]
+        valores_y = tercer_ciclo.GetYValues()
+        corrientes = _net_a_ndarray(valores_y, _scratch(valores_y.Length))
+        if log.isEnabledFor(logging.DEBUG):
             log.debug("  Ciclo 3: %d puntos de corriente extraídos", len(corrientes))
-        except Exception as e:
-            log.error("✗ Error extrayendo datos del ciclo 3: %s", str(e))
-            return []
 
         # Retornar directamente los valores del tercer ciclo
         log.info("✓ Procesamiento completado: %d puntos obtenidos del ciclo 3", len(corrientes))
         return corrientes
 
-    except Exception as e:
-        # Manejo de errores global con traceback
-        try:
-            import traceback as _tb
-            log.error("✗ Error en procesamiento de ciclos: %s", _tb.format_exc())
-        except Exception:
-            log.error("✗ Error en procesamiento de ciclos: %s", str(e))
-        return []
+    except Exception:
+        # Único manejador: el traceback lo formatea logging solo si se emite
+        log.error("✗ Error en procesamiento de ciclos", exc_info=True)
+        return np.empty(0)
     
 
 
@@ -1837,6 +1910,46 @@ def procesar_ciclos_voltametricos(curves):
 # BLOQUE 7: ESTIMACIÓN DE CONCENTRACIONES PPM (VERSIÓN NORMA JSON/0639)
 # ===================================================================================
 
+METALES = ("Cd", "Zn", "Cu", "Cr", "Ni")
+# Umbrales de % del límite y clase resultante: <80, >=80, >=100, >=120
+_UMBRALES_PCT = np.array([80.0, 100.0, 120.0])
+_CLASES_PCT = ("SEGURA", "EN ATENCIÓN", "ANÓMALA", "CONTAMINADA")
+# Misma escala en etiquetas canónicas (80-100 % y 100-120 % se consideran anómalas)
+_ETIQUETAS_PCT = ("SEGURA", "ANOMALA", "ANOMALA", "CONTAMINADA")
+# Versión binaria de WaterClassifier: sobre el límite legal (>= 100 %) es contaminada
+_CLASES_MUESTRA_PCT = ("NO CONTAMINADA", "NO CONTAMINADA", "CONTAMINADA", "CONTAMINADA")
+
+def _indice_clase_pct(pct):
+    """Índice 0..3 de la clase para un % del límite (sin cadena de if/elif)."""
+    return int(np.searchsorted(_UMBRALES_PCT, pct, side='right'))
+
+def _vector_limites(limites_ppm):
+    """
+    Convierte los límites por metal en un vector float64 alineado con METALES.
+    Los límites ausentes o inválidos quedan como NaN y su motivo en `notas`
+    (None = límite utilizable).
+    """
+    limites_arr = np.full(len(METALES), np.nan)
+    notas = [None] * len(METALES)
+    for i, metal in enumerate(METALES):
+        limite = limites_ppm.get(metal) if isinstance(limites_ppm, dict) else None
+        if limite is None:
+            notas[i] = "missing_limit"
+            log.warning("⚠ Límite para %s ausente en limites_ppm", metal)
+            continue
+        try:
+            limite_val = float(limite)
+        except Exception:
+            notas[i] = "invalid_limit"
+            log.warning("⚠ Límite para %s no numérico: %s", metal, limite)
+            continue
+        if limite_val <= 0.0:
+            notas[i] = "invalid_limit_nonpositive"
+            log.warning("⚠ Límite para %s no válido (<=0): %s", metal, limite_val)
+            continue
+        limites_arr[i] = limite_val
+    return limites_arr, notas
+
 def calcular_estimaciones_ppm(datos_pca, limites_ppm):
     """
     Calcula estimaciones de concentración PPM basadas en los límites oficiales
@@ -1855,7 +1968,7 @@ def calcular_estimaciones_ppm(datos_pca, limites_ppm):
       y "method" (metodología usada para la estimación).
 
     Args:
-        datos_pca (list): Datos PCA procesados (valores numéricos representativos)
+        datos_pca (list or np.ndarray): Datos PCA procesados (valores numéricos representativos)
         limites_ppm (dict): Límites legales de metales (ej. {"Cd":0.1,"Zn":3.0,...})
 
     Returns:
@@ -1869,90 +1982,46 @@ def calcular_estimaciones_ppm(datos_pca, limites_ppm):
             "method": "pca_peak_vs_limit"
           }
     """
-    if not datos_pca:
+    datos_pca = np.asarray(datos_pca, dtype=np.float64)
+    if datos_pca.size == 0:
         log.warning("⚠ No hay datos PCA para calcular PPM")
         return {}
 
     try:
         # 1. Obtener un valor representativo desde datos_pca (aquí: valor pico)
         try:
-            valor_pico = float(max(datos_pca))
+            valor_pico = float(datos_pca.max())
         except Exception as e:
             log.error("✗ No se pudo extraer valor_pico de 'datos_pca': %s", e)
             return {}
 
         log.info("🔎 Valor pico PCA usado para estimación: %.6f", valor_pico)
 
-        # 2. Preparar resultados por metal con formato claro y trazable
-        resultados = {}
-        clasificacion = "SEGURA"  # valor inicial
-        max_superacion_pct = 0.0  # para determinar la clasificación global
-
-        # Lista ordenada de metales (consistente en todo el pipeline)
-        metales = ["Cd", "Zn", "Cu", "Cr", "Ni"]
+        # 2. Límites como vector contiguo (orden consistente en todo el pipeline)
+        limites_arr, notas = _vector_limites(limites_ppm)
+        validos = np.array([nota is None for nota in notas])
 
-        for metal in metales:
-            # Inicializar sub-dict por metal
-            resultados[metal] = {"ppm": None, "pct_of_limit": None, "note": None}
-
-            # Intentar extraer límite numérico para el metal
-            limite = None
-            try:
-                if isinstance(limites_ppm, dict):
-                    limite = limites_ppm.get(metal)
-            except Exception:
-                limite = None
-
-            # Validaciones del límite
-            if limite is None:
-                resultados[metal]["note"] = "missing_limit"
-                log.warning("⚠ Límite para %s ausente en limites_ppm", metal)
-                continue
-
-            try:
-                limite_val = float(limite)
-            except Exception:
-                resultados[metal]["note"] = "invalid_limit"
-                log.warning("⚠ Límite para %s no numérico: %s", metal, limite)
-                continue
-
-            if limite_val <= 0.0:
-                resultados[metal]["note"] = "invalid_limit_nonpositive"
-                log.warning("⚠ Límite para %s no válido (<=0): %s", metal, limite_val)
-                continue
-
-            # Calcular porcentaje respecto al límite: (valor_pico / limite) * 100
-            try:
-                pct = (valor_pico / limite_val) * 100.0
-                # Validar numérico
-                pct = float(pct)
-                if pct != pct or pct in (float("inf"), float("-inf")):
-                    raise ValueError("porcentaje inválido")
-            except Exception:
-                resultados[metal]["note"] = "calc_error"
-                log.warning("⚠ Resultado no numérico para %s (valor_pico=%s, limite=%s)", metal, valor_pico, limite_val)
-                continue
-
-            # Guardar pct_of_limit y dejar ppm como None (salvo que exista calibración externa)
-            resultados[metal]["pct_of_limit"] = pct
-            resultados[metal]["ppm"] = None  # No estimamos ppm directo aquí
-            resultados[metal]["note"] = None
-
-            log.debug("  %s: %.2f %% del límite (límite=%.6f)", metal, pct, limite_val)
-
-            # Actualizar máximo porcentaje observado
-            if pct > max_superacion_pct:
-                max_superacion_pct = pct
+        # Porcentaje respecto al límite: (valor_pico / limite) * 100, en una sola operación
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            pct_arr = np.where(validos, valor_pico / limites_arr * 100.0, np.nan)
+        errores = validos & ~np.isfinite(pct_arr)
 
         # 3. Determinar clasificación global en función del máximo porcentaje (pct_of_limit)
-        if max_superacion_pct >= 120.0:
-            clasificacion = "CONTAMINADA"
-        elif max_superacion_pct >= 100.0:
-            clasificacion = "ANÓMALA"
-        elif max_superacion_pct >= 80.0:
-            clasificacion = "EN ATENCIÓN"
-        else:
-            clasificacion = "SEGURA"
+        finitos = pct_arr[np.isfinite(pct_arr)]
+        max_superacion_pct = max(0.0, float(finitos.max())) if finitos.size else 0.0
+        clasificacion = _CLASES_PCT[_indice_clase_pct(max_superacion_pct)]
+
+        # 4. Resultados por metal (ppm queda None salvo que exista calibración externa)
+        resultados = {}
+        depurar = log.isEnabledFor(logging.DEBUG)  # una consulta por muestra, no por metal
+        for i, metal in enumerate(METALES):
+            if errores[i]:
+                notas[i] = "calc_error"
+                log.warning("⚠ Resultado no numérico para %s (valor_pico=%s, limite=%s)", metal, valor_pico, limites_arr[i])
+            pct = float(pct_arr[i]) if notas[i] is None else None
+            resultados[metal] = {"ppm": None, "pct_of_limit": pct, "note": notas[i]}
+            if depurar and pct is not None:
+                log.debug("  %s: %.2f %% del límite (límite=%.6f)", metal, pct, limites_arr[i])
 
         # Añadir metadatos auxiliares para trazabilidad
         resultados["clasificacion"] = clasificacion
@@ -1971,6 +2040,111 @@ def calcular_estimaciones_ppm(datos_pca, limites_ppm):
 # BLOQUE 7.5: SISTEMA DE CLASIFICACIÓN AVANZADO
 # ===================================================================================
 
+# fastmath sin 'nnan'/'ninf': los kernels dependen de np.isfinite para descartar NaN/Inf
+_FASTMATH_FINITO = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+if numba is not None:
+    @numba.njit(cache=True, fastmath=_FASTMATH_FINITO)
+    def _normalizar_minmax_nb(x):
+        """Min-max en una sola pasada de lectura y otra de escritura; no finitos -> 0."""
+        lo = np.inf
+        hi = -np.inf
+        for v in x:
+            if np.isfinite(v):
+                if v < lo:
+                    lo = v
+                if v > hi:
+                    hi = v
+        rng = hi - lo
+        out = np.empty_like(x)
+        for i in range(x.size):
+            v = x[i]
+            if not np.isfinite(v):
+                out[i] = 0.0
+            elif rng > 0:
+                out[i] = (v - lo) / rng
+            else:
+                out[i] = v
+        return out
+
+    @numba.njit(cache=True, fastmath=_FASTMATH_FINITO)
+    def _preproc_project_nb(x, mean, comp, limites):
+        """
+        Normalización min-max + proyección PCA + % del límite en un único kernel:
+        la curva se lee dos veces (rango y proyección) sin arrays intermedios.
+        Devuelve (scores, max_pct); max_pct es NaN si no hay límites válidos.
+        """
+        lo = np.inf
+        hi = -np.inf
+        for v in x:
+            if np.isfinite(v):
+                if v < lo:
+                    lo = v
+                if v > hi:
+                    hi = v
+        rng = hi - lo
+        k = comp.shape[0]
+        scores = np.zeros(k)
+        for i in range(x.size):
+            v = x[i]
+            if not np.isfinite(v):
+                v = 0.0
+            elif rng > 0:
+                v = (v - lo) / rng
+            d = v - mean[i]
+            for j in range(k):
+                scores[j] += d * comp[j, i]
+        max_score = scores.max()
+        max_pct = np.nan
+        for lim in limites:
+            if np.isfinite(lim):
+                pct = max_score / lim * 100.0
+                if np.isnan(max_pct) or pct > max_pct:
+                    max_pct = pct
+        return scores, max_pct
+else:
+    _normalizar_minmax_nb = None
+    _preproc_project_nb = None
+
+def _normalizar_minmax(datos):
+    """
+    Normalización min-max de una curva a float64 (1-D). El rango se calcula solo
+    con valores finitos y los NaN/Inf quedan en 0.0; si la curva es constante
+    se devuelve sin escalar. Usa el kernel Numba si está disponible.
+    """
+    x = np.asarray(datos, dtype=np.float64).ravel()
+    if _normalizar_minmax_nb is not None:
+        return _normalizar_minmax_nb(x)
+    x = x.copy()  # una sola copia; el resto de operaciones es en sitio
+    finitos = np.isfinite(x)
+    todos = bool(finitos.all())
+    validos = x if todos else x[finitos]
+    if validos.size:
+        lo, hi = validos.min(), validos.max()
+        if hi > lo:
+            np.subtract(x, lo, out=x)
+            np.divide(x, hi - lo, out=x)
+    if not todos:
+        x[~finitos] = 0.0
+    return x
+
+def _normalizar_minmax_filas(matriz):
+    """
+    Versión por lotes de _normalizar_minmax: normaliza cada fila de una matriz
+    (N, D) con su propio min/max finito, sin bucle Python. Las filas constantes
+    quedan sin escalar y los NaN/Inf en 0.0, igual que en la versión 1-D.
+    """
+    X = np.array(matriz, dtype=np.float64, ndmin=2)  # copia propia; se opera en sitio
+    finitos = np.isfinite(X)
+    lo = np.where(finitos, X, np.inf).min(axis=1, keepdims=True)
+    hi = np.where(finitos, X, -np.inf).max(axis=1, keepdims=True)
+    rango = hi - lo
+    escalar = np.isfinite(rango) & (rango > 0)
+    np.subtract(X, lo, out=X, where=escalar)
+    np.divide(X, rango, out=X, where=escalar)
+    X[~finitos] = 0.0
+    return X
+
 class WaterClassifier:
     """
     Sistema avanzado de clasificación de muestras de agua basado en análisis PCA
@@ -1992,11 +2166,18 @@ class WaterClassifier:
         """
         try:
             from sklearn.decomposition import PCA
-            import numpy as np
-            
+
             self.pca = PCA(n_components=n_components)
             self.threshold = threshold
             self.np = np  # Guardar referencia a numpy
+
+            # Límites oficiales cargados una vez (memo por mtime) y alineados con METALES
+            self._limits = cargar_limites_ppm("limits_ppm.json")
+            self._limits_arr, _ = _vector_limites(self._limits)
+
+            # Proyección PCA cacheada tras fit(): media y componentes en float64
+            self._mean = None
+            self._comp = None
             
             self.confidence_levels = {
                 "ALTA": 0.85,
@@ -2022,25 +2203,45 @@ class WaterClassifier:
             array: Datos preprocesados y normalizados
         """
         try:
-            # Convertir a array numpy si no lo es
-            data = self.np.array(voltammetric_data)
-            
-            # Remover valores nulos o infinitos
-            data = self.np.nan_to_num(data)
-            
-            # Normalización min-max
-            if data.size > 0:
-                data_min = self.np.min(data)
-                data_max = self.np.max(data)
-                if data_max > data_min:
-                    data = (data - data_min) / (data_max - data_min)
-            
-            return data.reshape(1, -1)  # Reshape para PCA
+            # Normalización min-max fusionada (valores nulos o infinitos -> 0)
+            return _normalizar_minmax(voltammetric_data).reshape(1, -1)  # Reshape para PCA
             
         except Exception as e:
             log.error("✗ Error en preprocesamiento: %s", str(e))
             return None
     
+    def fit(self, training_matrix):
+        """
+        Ajusta el PCA una sola vez sobre un lote representativo de muestras.
+        Cada fila se preprocesa igual que en classify_sample; después cada
+        clasificación es solo la proyección (x - mean_) @ components_.T.
+        
+        Args:
+            training_matrix (2D array): Una muestra voltamétrica por fila
+            
+        Returns:
+            WaterClassifier: self (encadenable)
+        """
+        X = self.np.vstack([self._preprocess_data(fila) for fila in training_matrix])
+        n = self.pca.n_components
+        
+        # PCA directo por autodescomposición de la covarianza (LAPACK SYEVR vía
+        # eigh): evita el SVD de la matriz de datos completa
+        mean = X.mean(axis=0)
+        Xc = X - mean
+        cov = (Xc.T @ Xc) / max(X.shape[0] - 1, 1)
+        _, vectores = self.np.linalg.eigh(cov)  # autovalores en orden ascendente
+        comp = vectores[:, ::-1][:, :n].T.copy()
+        
+        # Signo determinista como en scikit-learn: mayor |carga| positiva
+        pivote = self.np.argmax(self.np.abs(comp), axis=1)
+        comp *= self.np.sign(comp[self.np.arange(n), pivote])[:, None]
+        
+        self._mean = mean
+        self._comp = comp
+        log.info("✓ PCA ajustado con %d muestras x %d puntos", X.shape[0], X.shape[1])
+        return self
+
     def _calculate_confidence(self, pca_result):
         """
         Calcula el nivel de confianza de la clasificación.
@@ -2080,49 +2281,55 @@ class WaterClassifier:
                 {
                     "classification": str,  # CONTAMINADA/NO CONTAMINADA
                     "confidence": str,      # ALTA/MEDIA/BAJA
-                    "pca_scores": list     # Scores PCA como lista
+                    "pca_scores": ndarray  # Scores PCA (float64 1-D, sin copia a lista)
                 }
         """
         try:
             # Validar datos de entrada
-            if not voltammetric_data or len(voltammetric_data) == 0:
+            if voltammetric_data is None or len(voltammetric_data) == 0:
                 log.warning("⚠ Datos voltamétricos vacíos")
                 return None
             
-            # Preprocesamiento
-            processed_data = self._preprocess_data(voltammetric_data)
-            if processed_data is None:
+            # Análisis PCA: proyección con el ajuste cacheado (un PCA de 1 fila no es válido)
+            if self._comp is None:
+                log.error("✗ Clasificador sin ajustar: llamar a fit() con un lote de entrenamiento")
                 return None
             
-            # Análisis PCA
-            pca_result = self.pca.fit_transform(processed_data)
+            # El kernel Numba no comprueba límites: la curva debe tener tantos
+            # puntos como el ajuste (la ruta NumPy fallaría igualmente)
+            x = self.np.asarray(voltammetric_data, dtype=self.np.float64).ravel()
+            if x.size != self._mean.size:
+                log.error("✗ Longitud de curva %d distinta de la del ajuste PCA (%d)",
+                          x.size, self._mean.size)
+                return None
+            
+            if _preproc_project_nb is not None:
+                # Preprocesamiento + proyección + % del límite fusionados (Numba)
+                scores, max_pct = _preproc_project_nb(x, self._mean, self._comp, self._limits_arr)
+                pca_result = scores.reshape(1, -1)
+            else:
+                processed_data = self._preprocess_data(x)
+                if processed_data is None:
+                    return None
+                pca_result = (processed_data - self._mean) @ self._comp.T
+                
+                # Porcentaje de superación máxima respecto a límites (una sola división)
+                validos = self.np.isfinite(self._limits_arr)
+                max_pct = (float((self.np.max(pca_result) / self._limits_arr[validos] * 100.0).max())
+                           if validos.any() else float('nan'))
             max_value = self.np.max(pca_result)
             
             # Clasificación basada en límites oficiales del JSON (si disponibles)
             classification = "NO CONTAMINADA"
             try:
-                # Intentar cargar límites oficiales
-                with open("limits_ppm.json", "r") as f:
-                    limites_ppm = json.load(f)
+                # Límites cacheados en __init__; sin ninguno válido se usa el umbral estático
+                if self.np.isnan(max_pct):
+                    raise ValueError("sin límites válidos en limits_ppm.json")
                 
-                # Calcular porcentaje de superación máxima respecto a límites
-                max_superacion = 0.0
-                for metal in ["Cd", "Zn", "Cu", "Cr", "Ni"]:
-                    limite = limites_ppm.get(metal)
-                    if limite and limite > 0:
-                        porcentaje = (max_value / float(limite)) * 100.0
-                        if porcentaje > max_superacion:
-                            max_superacion = porcentaje
+                max_superacion = max(0.0, float(max_pct))
                 
                 # Determinar clasificación por porcentaje de superación
-                if max_superacion >= 120:
-                    classification = "CONTAMINADA"
-                elif max_superacion >= 100:
-                    classification = "CONTAMINADA"  # anómala pero sobre límite legal
-                elif max_superacion >= 80:
-                    classification = "NO CONTAMINADA"  # en atención pero bajo límite
-                else:
-                    classification = "NO CONTAMINADA"
+                classification = _CLASES_MUESTRA_PCT[_indice_clase_pct(max_superacion)]
                 
                 log.info("🏷 Clasificación (JSON): %s (máx. superación: %.2f%%)", classification, max_superacion)
             
@@ -2137,7 +2344,7 @@ class WaterClassifier:
             resultado = {
                 "classification": classification,
                 "confidence": confidence,
-                "pca_scores": pca_result.tolist()
+                "pca_scores": pca_result.ravel()
             }
             
             log.info("✓ Muestra clasificada: %s (confianza: %s)",
@@ -2149,6 +2356,61 @@ class WaterClassifier:
             log.error("✗ Error en clasificación: %s", traceback.format_exc())
             return None
 
+    def classify_batch(self, traces_matrix):
+        """
+        Clasifica N muestras de una vez con las mismas reglas que classify_sample,
+        sustituyendo el bucle por muestra por operaciones sobre la matriz completa:
+        normalización por filas, una sola proyección GEMM (X - mean_) @ components_.T,
+        máximo por fila y búsqueda vectorizada de la clase por % del límite.
+        
+        Args:
+            traces_matrix (2D array): Una muestra voltamétrica por fila (N, D)
+            
+        Returns:
+            list[dict]: Un resultado por fila con el formato de classify_sample,
+                        o None si el clasificador no está ajustado o falla el lote
+        """
+        try:
+            if self._comp is None:
+                log.error("✗ Clasificador sin ajustar: llamar a fit() con un lote de entrenamiento")
+                return None
+            
+            X = _normalizar_minmax_filas(traces_matrix)
+            if X.size == 0:
+                log.warning("⚠ Lote voltamétrico vacío")
+                return []
+            
+            pca_result = (X - self._mean) @ self._comp.T  # (N, n_components)
+            max_values = pca_result.max(axis=1)
+            
+            validos = self.np.isfinite(self._limits_arr)
+            if validos.any():
+                # Máxima superación por muestra respecto al límite más estricto
+                porcentajes = max_values[:, None] / self._limits_arr[validos] * 100.0
+                max_superacion = self.np.maximum(porcentajes.max(axis=1), 0.0)
+                indices = self.np.searchsorted(_UMBRALES_PCT, max_superacion, side='right')
+                clases = [_CLASES_MUESTRA_PCT[k] for k in indices]
+            else:
+                log.warning("⚠ Uso de umbral estático: sin límites válidos en limits_ppm.json")
+                clases = ["CONTAMINADA" if v > self.threshold else "NO CONTAMINADA"
+                          for v in max_values]
+            
+            # Confianza vectorizada (mismos cortes que _calculate_confidence)
+            distancia = self.np.abs(self.np.abs(pca_result).max(axis=1) - self.threshold)
+            confianzas = self.np.where(
+                distancia > self.confidence_levels["ALTA"], "ALTA",
+                self.np.where(distancia > self.confidence_levels["MEDIA"], "MEDIA", "BAJA"))
+            
+            log.info("✓ Lote clasificado: %d muestras", len(clases))
+            return [
+                {"classification": c, "confidence": str(conf), "pca_scores": fila}
+                for c, conf, fila in zip(clases, confianzas, pca_result)
+            ]
+            
+        except Exception:
+            log.error("✗ Error en clasificación por lotes: %s", traceback.format_exc())
+            return None
+
 
 
 
@@ -2173,13 +2435,19 @@ def cargar_sesion_pssession(metodo_load, ruta_archivo):
         return None
     
     try:
-        # Preparar argumentos según número de parámetros del método
-        argumentos = [String(ruta_archivo)]
-        num_params = metodo_load.GetParameters().Length
-        log.debug("🔧 Método LoadSessionFile detectado con %d parámetros", num_params)
+        # Preparar argumentos según número de parámetros del método (aridad cacheada
+        # si es el método configurado por cargar_y_configurar_metodo_load)
+        if metodo_load is _METODO_LOAD:
+            num_params = _LOAD_NUM_PARAMS
+        else:
+            num_params = metodo_load.GetParameters().Length
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("🔧 Método LoadSessionFile detectado con %d parámetros", num_params)
 
         if num_params == 2:
-            argumentos.append(Boolean(False))
+            argumentos = [String(ruta_archivo), _BOX_FALSE]
+        else:
+            argumentos = [String(ruta_archivo)]
         
         # Invocar método de carga
         sesion = metodo_load.Invoke(None, argumentos)
@@ -2204,6 +2472,57 @@ def cargar_sesion_pssession(metodo_load, ruta_archivo):
 # BLOQUE 9: GENERACIÓN AVANZADA DE CSV PCA+PPM
 # ===================================================================================
 
+def _float_csv(v):
+    """Valor numérico para el CSV; None (celda vacía) si falta o no es convertible."""
+    try:
+        return float(v) if v is not None else None
+    except Exception:
+        return None
+
+def _pct_csv(v):
+    """% del límite de una estimación (dict con 'pct_of_limit'/'pct' o número)."""
+    if isinstance(v, dict):
+        v = v.get('pct_of_limit') or v.get('pct') or None
+    return _float_csv(v)
+
+# Filas acumuladas por escritura y terminador de línea (el mismo que csv.writer)
+_CSV_FILAS_POR_BLOQUE = 8192
+_CSV_FIN_LINEA = "\r\n"
+
+def _celda_csv(v):
+    """Texto de una celda; solo se entrecomilla si contiene separador, comillas o saltos."""
+    if v is None:
+        return ""
+    s = v if isinstance(v, str) else str(v)
+    if ',' in s or '"' in s or '\n' in s or '\r' in s:
+        return '"' + s.replace('"', '""') + '"'
+    return s
+
+def _escribir_csv_filas(ruta_csv, encabezados, columnas):
+    """
+    Escribe las columnas (array, máscara de vacíos) sin el módulo csv: cada
+    columna se formatea una vez (repr de float para los numéricos, que nunca
+    requieren comillas) y las filas se unen con str.join y se vuelcan por bloques.
+    """
+    celdas = []
+    for col, vacios in columnas:
+        if col.dtype == object:
+            textos = [_celda_csv(v) for v in col]
+        else:
+            textos = [repr(v) for v in col.tolist()]
+            if vacios is not None:
+                for k in np.flatnonzero(vacios).tolist():
+                    textos[k] = ""
+        celdas.append(textos)
+    filas = map(','.join, zip(*celdas))
+    with open(ruta_csv, 'w', newline='', encoding='utf-8', buffering=1 << 20) as archivo_csv:
+        archivo_csv.write(','.join(_celda_csv(h) for h in encabezados) + _CSV_FIN_LINEA)
+        while True:
+            bloque = list(itertools.islice(filas, _CSV_FILAS_POR_BLOQUE))
+            if not bloque:
+                break
+            archivo_csv.write(_CSV_FIN_LINEA.join(bloque) + _CSV_FIN_LINEA)
+
 def generar_csv_matriz_pca_ppm(resultados_mediciones):
     """
     Genera archivo CSV con matriz PCA y estimaciones PPM
@@ -2262,86 +2581,73 @@ def generar_csv_matriz_pca_ppm(resultados_mediciones):
         # Ruta del archivo CSV
         ruta_csv = os.path.join(directorio_data, 'matriz_pca.csv')
         
-        # Escribir CSV con codificación UTF-8
-        with open(ruta_csv, 'w', newline='', encoding='utf-8') as archivo_csv:
-            escritor = csv.writer(archivo_csv)
+        # Columnas preasignadas y llenadas en una sola pasada (sin listas por fila)
+        n = len(resultados_mediciones)
+        sensor_ids = np.empty(n, dtype=object)
+        titulos = np.empty(n, dtype=object)
+        pca = np.full((n, longitud_pca), np.nan)
+        longitudes = np.zeros(n, dtype=np.intp)
+        # Escalares numéricos + máscara de "falta" (un NaN real se escribe como 'nan')
+        pcts = np.full((n, len(METALES)), np.nan)
+        pcts_vacios = np.zeros((n, len(METALES)), dtype=bool)
+        escalares = np.full((n, 2), np.nan)  # ppm_modelo, contamination_level_pct
+        escalares_vacios = np.zeros((n, 2), dtype=bool)
+        clasificaciones = np.empty(n, dtype=object)
+        metadatos = np.empty((n, 5), dtype=object)
+        
+        for i, resultado in enumerate(resultados_mediciones):
+            sensor_ids[i] = resultado.get('sensor_id', 'N/A')
+            titulos[i] = resultado.get('title', 'Sin título')
             
-            # Escribir encabezados
-            escritor.writerow(encabezados)
+            # Datos PCA (ciclo 3 ya procesado en Bloque 10): se truncan a
+            # 'longitud_pca' y lo que falte queda como campo vacío en el CSV
+            datos_pca = resultado.get('pca_scores')
+            if datos_pca is not None:
+                fila_pca = np.asarray(datos_pca, dtype=np.float64).ravel()[:longitud_pca]
+                pca[i, :fila_pca.size] = fila_pca
+                longitudes[i] = fila_pca.size
             
-            registros_escritos = 0
-            # Escribir datos de cada medición
-            for resultado in resultados_mediciones:
-                fila_datos = [
-                    resultado.get('sensor_id', 'N/A'),
-                    resultado.get('title', 'Sin título')
-                ]
-                
-                # Agregar datos PCA (ciclo 3 ya procesado en Bloque 10)
-                datos_pca = resultado.get('pca_scores', []) or []
-                
-                # Asegurar que cada fila tenga exactamente 'longitud_pca' valores:
-                # - si faltan, se rellenan con None (campo vacío en CSV)
-                # - si sobran, se truncan (manteniendo consistencia con encabezados)
-                if len(datos_pca) < longitud_pca:
-                    padding = [None] * (longitud_pca - len(datos_pca))
-                    datos_pca_row = list(datos_pca) + padding
+            # Estimaciones PPM por metal: calcular_estimaciones_ppm devuelve
+            # porcentajes (pct_of_limit) por diseño
+            estimaciones_ppm = resultado.get('ppm_estimations', {}) or {}
+            for j, metal in enumerate(METALES):
+                v = _pct_csv(estimaciones_ppm.get(metal))
+                if v is None:
+                    pcts_vacios[i, j] = True
                 else:
-                    datos_pca_row = list(datos_pca[:longitud_pca])
-                
-                fila_datos.extend(datos_pca_row)
-                
-                # Agregar estimaciones PPM (diccionario por metal) - se asume que
-                # calcular_estimaciones_ppm devuelve porcentajes (pct) por diseño.
-                estimaciones_ppm = resultado.get('ppm_estimations', {}) or {}
-                def _safe_get_pct(d, k):
-                    v = d.get(k)
-                    # Si v es dict y contiene 'pct' o 'pct_of_limit', extraerlo
-                    if isinstance(v, dict):
-                        return v.get('pct_of_limit') or v.get('pct') or None
-                    # Si es numérico, devolverlo
-                    try:
-                        return float(v) if v is not None else None
-                    except Exception:
-                        return None
-                
-                fila_datos.append(_safe_get_pct(estimaciones_ppm, 'Cd'))
-                fila_datos.append(_safe_get_pct(estimaciones_ppm, 'Zn'))
-                fila_datos.append(_safe_get_pct(estimaciones_ppm, 'Cu'))
-                fila_datos.append(_safe_get_pct(estimaciones_ppm, 'Cr'))
-                fila_datos.append(_safe_get_pct(estimaciones_ppm, 'Ni'))
-                
-                # Agregar predicción global del modelo en ppm (si existe)
-                ppm_modelo = resultado.get('ppm_modelo', None)
-                try:
-                    ppm_modelo_val = float(ppm_modelo) if ppm_modelo is not None else None
-                except Exception:
-                    ppm_modelo_val = None
-                fila_datos.append(ppm_modelo_val)
-                
-                # Agregar nivel de contaminación y clasificación global
-                # 'contamination_level' en el resultado ya representa % (según Bloque 10)
-                contamination_level = resultado.get('contamination_level', None)
-                try:
-                    contamination_level_val = float(contamination_level) if contamination_level is not None else None
-                except Exception:
-                    contamination_level_val = None
-                fila_datos.append(contamination_level_val)
-                fila_datos.append(resultado.get('clasificacion', 'DESCONOCIDA'))
-                
-                # Agregar metadatos del modelo (si existen)
-                model_meta = resultado.get('model_meta', {}) or {}
-                fila_datos.append(model_meta.get('model_version'))
-                fila_datos.append(model_meta.get('used_n_features'))
-                fila_datos.append(bool(model_meta.get('used_baseline')))
-                fila_datos.append(model_meta.get('baseline_source'))
-                fila_datos.append(model_meta.get('notes'))
-                
-                # Normalizar valores None a '' para CSV (mejora legibilidad)
-                fila_datos_csv = [("" if v is None else v) for v in fila_datos]
-                
-                escritor.writerow(fila_datos_csv)
-                registros_escritos += 1
+                    pcts[i, j] = v
+            
+            # Predicción global del modelo (ppm) y nivel de contaminación (%)
+            for j, clave in enumerate(('ppm_modelo', 'contamination_level')):
+                v = _float_csv(resultado.get(clave))
+                if v is None:
+                    escalares_vacios[i, j] = True
+                else:
+                    escalares[i, j] = v
+            clasificaciones[i] = resultado.get('clasificacion', 'DESCONOCIDA')
+            
+            # Metadatos del modelo (trazabilidad)
+            model_meta = resultado.get('model_meta', {}) or {}
+            metadatos[i] = (
+                model_meta.get('model_version'),
+                model_meta.get('used_n_features'),
+                bool(model_meta.get('used_baseline')),
+                model_meta.get('baseline_source'),
+                model_meta.get('notes'),
+            )
+        
+        # Columnas en el orden de los encabezados; máscara = celda vacía en el CSV
+        pca_validos = np.arange(longitud_pca) < longitudes[:, None]
+        columnas = [(sensor_ids, None), (titulos, None)]
+        columnas += [(pca[:, j], ~pca_validos[:, j]) for j in range(longitud_pca)]
+        columnas += [(pcts[:, j], pcts_vacios[:, j]) for j in range(len(METALES))]
+        columnas += [(escalares[:, j], escalares_vacios[:, j]) for j in range(2)]
+        columnas += [(clasificaciones, None)]
+        columnas += [(metadatos[:, j], None) for j in range(metadatos.shape[1])]
+        
+        # Escribir CSV con codificación UTF-8
+        _escribir_csv_filas(ruta_csv, encabezados, columnas)
+        registros_escritos = n
         
         log.info("✓ CSV matriz PCA+PPM generado exitosamente: %s", ruta_csv)
         log.info("  Registros escritos: %d", registros_escritos)
@@ -2392,11 +2698,6 @@ def predecir_con_modelo_entrenado(datos_pca):
         }
     """
     try:
-        import numpy as np
-        from pathlib import Path
-        import joblib
-        import traceback
-
         ROOT = Path(__file__).resolve().parents[1]
         MODELS_DIR = ROOT / "models"
 
@@ -2681,10 +2982,11 @@ def extraer_y_procesar_sesion_completa(ruta_archivo, limites_ppm):
             # Procesar curvas individuales (todas, para visualización)
             curvas_detalladas = []
             for idx_curva, curva in enumerate(array_curvas):
+                # Copia en bloque desde .NET sin crear un float de Python por muestra
                 curva_info = {
                     'index': idx_curva,
-                    'potentials': [float(x) for x in curva.GetXValues()],
-                    'currents': [float(y) for y in curva.GetYValues()]
+                    'potentials': _net_a_ndarray(curva.GetXValues()),
+                    'currents': _net_a_ndarray(curva.GetYValues())
                 }
                 curvas_detalladas.append(curva_info)
 
@@ -2694,7 +2996,7 @@ def extraer_y_procesar_sesion_completa(ruta_archivo, limites_ppm):
             resultado_modelo = predecir_con_modelo_entrenado(datos_pca)
             ppm_predicho = resultado_modelo.get("ppm_promedio")
 
-            if not datos_pca:
+            if not len(datos_pca):
                 log.warning("⚠ No se pudo procesar PCA para medición %d", idx)
                 continue
 
@@ -2737,14 +3039,7 @@ def extraer_y_procesar_sesion_completa(ruta_archivo, limites_ppm):
                     continue
 
             # Determinar clasificación textual (canónica) usando el máximo % observado
-            if nivel_contaminacion >= 120.0:
-                raw_label = "CONTAMINADA"
-            elif nivel_contaminacion >= 100.0:
-                raw_label = "ANOMALA"
-            elif nivel_contaminacion >= 80.0:
-                raw_label = "ANOMALA"
-            else:
-                raw_label = "SEGURA"
+            raw_label = _ETIQUETAS_PCT[_indice_clase_pct(nivel_contaminacion)]
 
             # Normalizar a etiqueta canónica y etiqueta de presentación
             try:
@@ -2758,19 +3053,19 @@ def extraer_y_procesar_sesion_completa(ruta_archivo, limites_ppm):
             # Consolidar información completa de la medición
             info_medicion.update({
                 'curves': curvas_detalladas,
-                'pca_scores': datos_pca,
+                'pca_scores': datos_pca.copy(),  # datos_pca es vista del búfer del hilo
                 'ppm_estimations': estimaciones_ppm,
                 'clasificacion': clasificacion,
                 'display_label': display_label,
                 'contamination_level': nivel_contaminacion,
                 'model_meta': resultado_modelo.get('model_meta', {}),
                 'ppm_modelo': ppm_predicho,
-                'pca_points_count': len(datos_pca) if datos_pca else 0
+                'pca_points_count': len(datos_pca)
             })
 
             resultados_mediciones.append(info_medicion)
             log.info("  ✓ Medición procesada: %d curvas, %d puntos PCA, Clasificación=%s, Nivel=%.2f%%",
-                     len(curvas_detalladas), len(datos_pca) if datos_pca else 0,
+                     len(curvas_detalladas), len(datos_pca),
                      clasificacion, nivel_contaminacion)
 
         except Exception as e:
@@ -2792,7 +3087,7 @@ def extraer_y_procesar_sesion_completa(ruta_archivo, limites_ppm):
         'measurements': resultados_mediciones,
         'processing_summary': {
             'total_measurements': len(resultados_mediciones),
-            'successful_pca': sum(1 for m in resultados_mediciones if m.get('pca_scores')),
+            'successful_pca': sum(1 for m in resultados_mediciones if len(m.get('pca_scores', ()))),
             'csv_generated': csv_generado
         }
     }
@@ -2840,7 +3135,12 @@ def extract_session_dict(filepath):
 
         for m in resultado_completo.get('measurements', []):
             # Detectar scores de PCA bajo cualquiera de las dos claves
-            pca_scores = m.get('pca_scores') or m.get('pca_data') or []
+            pca_scores = m.get('pca_scores')
+            if pca_scores is None or not len(pca_scores):
+                pca_scores = m.get('pca_data') or []
+            # Frontera con la GUI/BD: aquí sí se materializa la lista
+            if isinstance(pca_scores, np.ndarray):
+                pca_scores = pca_scores.tolist()
 
             # Asegurar ppm_estimations como dict con todas las claves
             ppm_estimations = m.get('ppm_estimations') or {}
@@ -2937,7 +3237,8 @@ def main():
                 log.error("✗ Error al guardar en la BD: %s", e)
 
             # Salida JSON limpia por stdout
-            print(json.dumps(resultado_procesamiento, indent=2, ensure_ascii=False, default=str))
+            print(json.dumps(resultado_procesamiento, indent=2, ensure_ascii=False,
+                             default=lambda o: o.tolist() if hasattr(o, 'tolist') else str(o)))
             log.info("✅ Procesamiento exitoso - JSON enviado a stdout")
             sys.exit(0)
         else:
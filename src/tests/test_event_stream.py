@@ -20,6 +20,7 @@ async def on_data(event: DeviceEvent):
 async def main():
     await event_manager.start()
     event_manager.subscribe('cv_data_point', on_data)
+    event_manager.subscribe('cv_data_batch', on_data)
 
     # intentar localizar una psession en data/ (usar la que exista)
     import os
@@ -30,10 +31,9 @@ async def main():
 
     # cargar dll para construir metodo_load (si es necesario)
     dll = configurar_sdk_palmsens()
-    # Ejecutar simulación en hilo para no bloquear y capturar excepciones
-    loop = asyncio.get_running_loop()
+    # La simulación es una corrutina: corre en este mismo bucle de eventos
     try:
-        await loop.run_in_executor(None, simulate_stream_from_pssession, None, test_ps, 5.0, 'TEST_SIM')
+        await simulate_stream_from_pssession(None, test_ps, 5.0, 'TEST_SIM')
     except Exception:
         import traceback
         traceback.print_exc()
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import sys
 import os
 
@@ -28,3 +29,23 @@ async def test_publisher_receives_events():
     assert len(pub.published) >= 1
     topic, payload = pub.published[0]
     assert 'testroot/DEV1/data_point' in topic
+
+
+@pytest.mark.asyncio
+async def test_publisher_publishes_data_batches():
+    pub = IoTPublisher(topic_root='testroot')
+    await pub.start()
+
+    t0 = __import__('datetime').datetime(2024, 1, 1, 12, 0, 0)
+    ev = DeviceEvent(type='cv_data_batch', timestamp=__import__('datetime').datetime.now(),
+                     data={'potentials': [0.1, 0.2], 'currents': [1.0, 2.0], 't_ns': [0, 10], 't0': t0},
+                     device_id='DEV1')
+    await event_manager.emit_event(ev)
+
+    await asyncio.sleep(0.1)
+    await pub.stop()
+
+    topics = [t for t, _ in pub.published]
+    assert 'testroot/DEV1/data_batch' in topics
+    msg = json.loads(dict(pub.published)['testroot/DEV1/data_batch'])
+    assert msg['data']['t0'] == t0.isoformat()
@@ -1,6 +1,6 @@
 import numpy as np
 import pytest
-from preprocess import normalize_for_pca
+from preprocess import normalize_for_pca, baseline_subtract
 from sklearn.preprocessing import StandardScaler
 
 
@@ -26,3 +26,16 @@ def test_baseline_padding_truncation():
     assert meta.get('used_baseline') is True
     # Check that result has same shape
     assert Xs.shape == (1, 3)
+
+
+def test_baseline_subtract_copy_flag():
+    X = np.array([[1.0, 5.0], [3.0, 2.0]], dtype=np.float32)
+    out = baseline_subtract(X, method='col_min')
+    # Por defecto la entrada no se modifica
+    assert X[0, 0] == 1.0
+    assert np.allclose(out, [[0.0, 3.0], [2.0, 0.0]])
+    assert out.dtype == np.float32
+    # copy=False opera en sitio sobre el mismo buffer (mismo dtype de trabajo)
+    out_inplace = baseline_subtract(X, method='col_min', copy=False)
+    assert out_inplace is X
+    assert np.allclose(X, [[0.0, 3.0], [2.0, 0.0]])
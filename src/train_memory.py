@@ -108,7 +108,9 @@ print("--------------------------------------------------")
 
 # === NORMALIZACIÓN Y PCA ===
 print("Aplicando baseline subtraction...")
-X_bs = baseline_subtract(X, baseline_vector=None, method='col_min')
+# X no se vuelve a usar como matriz: la resta se hace en sitio. Se pasa el dtype de X
+# (float64) porque con el float32 por defecto se haría una copia igualmente
+X_bs = baseline_subtract(X, baseline_vector=None, method='col_min', copy=False, dtype=X.dtype)
 
 print("Aplicando scaler...")
 scaler = fit_scaler(X_bs)
@@ -109,7 +109,9 @@ def main():
                 # Si processed es el resultado completo, tomar pca de la primera medición
                 if isinstance(processed, dict) and processed.get('measurements'):
                     first = processed['measurements'][0]
-                    datos_pca = first.get('pca_scores') or first.get('pca_data') or []
+                    datos_pca = first.get('pca_scores')
+                    if datos_pca is None or not len(datos_pca):
+                        datos_pca = first.get('pca_data') or []
                 else:
                     datos_pca = processed
 